@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Benchmark the availability check path against the local stub server.
+
+Two benchmarks are run:
+
+    check   back-to-back check_availability calls over distinct windows,
+            reporting request latency
+    cycles  run_continuously with no wait between cycles, reporting cycles
+            per second and cycle latency
+
+Both report the CPU time and peak RSS of this process. The stub runs in a
+separate process so its work is not counted.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from main import PhantomRanchChecker, logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or -1 if unknown."""
+    if resource is None:
+        return -1
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def start_stub(args):
+    """Start stub_server.py on a free port and return (process, url)."""
+    command = [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_server.py"),
+        "--port",
+        "0",
+        "--span-days",
+        str(args.span_days),
+        "--pattern",
+        args.pattern,
+        "--available-fraction",
+        str(args.available_fraction),
+        "--churn-rate",
+        str(args.churn_rate),
+        "--latency",
+        str(args.latency),
+        "--jitter",
+        str(args.jitter),
+        "--error-rate",
+        str(args.error_rate),
+        "--seed",
+        str(args.seed),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError("Stub server failed to start")
+    return process, line.split()[-1]
+
+
+def make_checker(url, args):
+    """Create a checker covering the benchmark date range."""
+    start = datetime.now()
+    return PhantomRanchChecker(
+        start_date=start,
+        end_date=start + timedelta(days=args.days),
+        check_interval=0,
+        cookies="session=benchmark",
+        base_url=url,
+        concurrency=args.concurrency,
+        pool_size=max(4, args.concurrency),
+        request_spacing=0,
+    )
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def report(label, count, elapsed, cpu, latencies, unit):
+    """Print one benchmark summary line."""
+    latencies.sort()
+    print(
+        f"{label:<7} {count / elapsed:9.1f} {unit}/s  "
+        f"p50 {percentile(latencies, 0.5) * 1000:8.2f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms  "
+        f"CPU {cpu:6.2f} s  peak RSS {peak_rss_mb():6.1f} MB"
+    )
+
+
+def bench_check(url, args):
+    """Time back-to-back check_availability calls."""
+    checker = make_checker(url, args)
+    check_date = datetime.now()
+    latencies = []
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for i in range(args.requests):
+        request_started = time.perf_counter()
+        checker.check_availability(check_date + timedelta(days=i % args.days))
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    checker.close()
+    report("check", args.requests, elapsed, cpu, latencies, "req")
+
+
+def bench_cycles(url, args):
+    """Run run_continuously for a fixed number of cycles, alerts silenced."""
+    checker = make_checker(url, args)
+    latencies = []
+    run_cycle = checker.run_cycle
+
+    def counted_cycle(window_requests):
+        cycle_started = time.perf_counter()
+        run_cycle(window_requests)
+        latencies.append(time.perf_counter() - cycle_started)
+        if len(latencies) >= args.cycles:
+            # run_continuously treats this as a normal stop and cleans up
+            raise KeyboardInterrupt
+
+    checker.run_cycle = counted_cycle
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        checker.run_continuously()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    report("cycles", len(latencies), elapsed, cpu, latencies, "cyc")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the availability check path against a local stub."
+    )
+    parser.add_argument(
+        "--benchmark",
+        choices=("all", "check", "cycles"),
+        default="all",
+        help="Which benchmark to run (default: all)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500, help="Calls for check (default: 500)"
+    )
+    parser.add_argument(
+        "--cycles", type=int, default=50, help="Cycles for cycles (default: 50)"
+    )
+    parser.add_argument(
+        "--days", type=int, default=365, help="Days to cover (default: 365)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Parallel fetches (default: 1)"
+    )
+    parser.add_argument(
+        "--span-days", type=int, default=40, help="Days per response (default: 40)"
+    )
+    parser.add_argument(
+        "--pattern",
+        choices=("none", "fixed", "sparse", "churn"),
+        default="churn",
+        help="Stub availability pattern (default: churn)",
+    )
+    parser.add_argument(
+        "--available-fraction",
+        type=float,
+        default=0.05,
+        help="Share of dates available (default: 0.05)",
+    )
+    parser.add_argument(
+        "--churn-rate",
+        type=float,
+        default=0.01,
+        help="Chance each date flips per request (default: 0.01)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Stub delay in seconds (default: 0)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Stub jitter in seconds (default: 0)"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of stub responses that are HTTP 500 (default: 0)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Stub random seed")
+    args = parser.parse_args()
+
+    # Keep the per-window log lines out of the timings
+    logger.disabled = True
+
+    process, url = start_stub(args)
+    try:
+        # The benchmarked checkers use no state database or event log, but run
+        # in a scratch directory so nothing they write lands in the working tree
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                if args.benchmark in ("all", "check"):
+                    bench_check(url, args)
+                if args.benchmark in ("all", "cycles"):
+                    bench_cycles(url, args)
+            finally:
+                os.chdir(cwd)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
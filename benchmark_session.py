@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request latency and open file descriptors for the checker's
+HTTP session, comparing a fresh session per request against the pooled
+keep-alive session, using the local stub server.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from main import PhantomRanchChecker, logger
+from stub_server import StubServer
+
+
+def count_open_fds():
+    """Count file descriptors open in this process (Linux/macOS)."""
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return -1
+
+
+def legacy_check(checker, check_date):
+    """Issue a request the old way: a new, never-closed session per call."""
+    session = requests.Session()
+    session.headers.update(checker.headers)
+    session.cookies.update(checker._parse_cookie_string(checker.cookies))
+    response = session.post(
+        checker.base_url, data=checker._build_payload(check_date), timeout=30
+    )
+    return response.json()
+
+
+def run(label, check, requests_count):
+    """Time `requests_count` calls to `check` and print a summary."""
+    fds_before = count_open_fds()
+    latencies = []
+    check_date = datetime.now()
+    for i in range(requests_count):
+        started = time.perf_counter()
+        check(check_date + timedelta(days=30 * i))
+        latencies.append((time.perf_counter() - started) * 1000)
+    fds_after = count_open_fds()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<10} mean {statistics.mean(latencies):7.2f} ms  "
+        f"p50 {statistics.median(latencies):7.2f} ms  p99 {p99:7.2f} ms  "
+        f"open FDs {fds_before} -> {fds_after}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark pooled vs per-request HTTP sessions."
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per run (default: 200)"
+    )
+    args = parser.parse_args()
+
+    server = StubServer()
+    server.start()
+
+    checker = PhantomRanchChecker(
+        start_date=datetime.now(),
+        end_date=datetime.now() + timedelta(days=365),
+        cookies="session=benchmark",
+        base_url=server.url,
+    )
+    # Keep the per-window log lines out of the timings
+    logger.disabled = True
+
+    run("legacy", lambda d: legacy_check(checker, d), args.requests)
+    run("pooled", checker.check_availability, args.requests)
+
+    checker.close()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark how quickly the checker starts up.
+
+Two measurements are taken, each in fresh interpreters so nothing is cached
+in-process:
+
+    import         cumulative time to `import main`, from `python -X importtime`,
+                   with the slowest top-level imports it pulls in
+    first-request  wall time from launching `main.py` to the first availability
+                   request reaching a local stub server
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from stub_server import StubRequestHandler, StubServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times():
+    """
+    Import `main` in a fresh interpreter with -X importtime.
+
+    Returns:
+        (cumulative microseconds for main, [(cumulative us, module)] for the
+        modules main imports directly)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    direct = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        if name.strip() == "main":
+            total = int(cumulative)
+        # One level of indentation below main: its direct imports
+        elif name.startswith("   ") and not name.startswith("    "):
+            direct.append((int(cumulative), name.strip()))
+    return total, sorted(direct, reverse=True)
+
+
+class FirstRequestHandler(StubRequestHandler):
+    """Stub handler that flags the first availability request."""
+
+    def do_POST(self):
+        self.server.first_request.set()
+        super().do_POST()
+
+
+class StartupStubServer(StubServer):
+    """Stub server that records when the first request arrives."""
+
+    def __init__(self):
+        super().__init__()
+        self.RequestHandlerClass = FirstRequestHandler
+        self.first_request = threading.Event()
+
+    def handle_error(self, request, client_address):
+        """Ignore the broken connections left by terminating the checker."""
+
+
+def time_to_first_request(server, timeout):
+    """
+    Launch main.py against the stub and time its first availability request.
+
+    Returns:
+        Seconds from launch to the first request, or None on timeout
+    """
+    server.first_request.clear()
+    with tempfile.TemporaryDirectory() as workdir:
+        command = [
+            sys.executable,
+            os.path.join(HERE, "main.py"),
+            "--base-url",
+            server.url,
+            "--cookies",
+            "session=benchmark",
+            "--state-db",
+            os.path.join(workdir, "state.db"),
+            "--request-spacing",
+            "0",
+        ]
+        started = time.perf_counter()
+        # Run from a temp dir so logs and results stay out of the tree
+        process = subprocess.Popen(
+            command,
+            cwd=workdir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not server.first_request.wait(timeout):
+                return None
+            return time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checker startup time.")
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Launches to time (default: 5)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to wait for the first request (default: 30)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=8, help="Slowest imports to list (default: 8)"
+    )
+    args = parser.parse_args()
+
+    imports = []
+    for _ in range(args.runs):
+        total, direct = import_times()
+        imports.append(total)
+    print(f"import         median {statistics.median(imports) / 1000:8.1f} ms")
+    for cumulative, name in direct[: args.top]:
+        print(f"  {name:<28} {cumulative / 1000:8.1f} ms")
+
+    server = StartupStubServer()
+    server.start()
+    try:
+        timings = []
+        for _ in range(args.runs):
+            elapsed = time_to_first_request(server, args.timeout)
+            if elapsed is None:
+                print(f"No request within {args.timeout:.0f} s", file=sys.stderr)
+                sys.exit(1)
+            timings.append(elapsed)
+        print(
+            f"first-request  median {statistics.median(timings) * 1000:8.1f} ms  "
+            f"min {min(timings) * 1000:8.1f} ms  max {max(timings) * 1000:8.1f} ms"
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
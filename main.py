@@ -1,27 +1,414 @@
+"""
+Phantom Ranch Availability Checker
+
+This script continuously checks for accommodations availability at Phantom Ranch in the Grand Canyon.
+It will check ALL available dates by default and notify you when anything becomes available.
+"""
+
 import argparse
+import atexit
 import datetime
+import gzip
+import hashlib
+import json
 import logging
 import logging.handlers
 import os
 import platform
-import smtplib
-import subprocess
+import queue
+import random
+import signal
+import sqlite3
 import sys
+import threading
 import time
-from datetime import datetime, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
 
 import requests
-from dotenv import load_dotenv
+from urllib3.util.connection import is_connection_dropped
+
+# smtplib, email.mime, subprocess, NumPy, python-dotenv and refresh_cookies
+# are imported where they are first used, so importing this module (and
+# reaching the first request) stays fast. Logging is set up by main().
+logger = logging.getLogger(__name__)
+
+
+# Log file for each --log-format
+LOG_FILES = {"text": "phantom_ranch_checker.log", "json": "phantom_ranch_checker.jsonl"}
+
+# Pass as `extra` on routine per-window and per-cycle lines, which
+# --log-sample thins out
+CHATTY = {"chatty": True}
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class SampleFilter(logging.Filter):
+    """Keep a fixed share of CHATTY records, evenly spread; keep all others."""
+
+    def __init__(self, rate: float):
+        """
+        Initialize the filter.
+
+        Args:
+            rate: Share of chatty records to keep, from 0 to 1
+        """
+        super().__init__()
+        self.rate = rate
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "chatty", False):
+            return True
+        with self._lock:
+            self._credit += self.rate
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one compact JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "t": round(record.created, 3),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS and name != "chatty":
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """Compress a rotated log file (RotatingFileHandler.rotator)."""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        while True:
+            chunk = f_in.read(1024 * 1024)
+            if not chunk:
+                break
+            f_out.write(chunk)
+    os.remove(source)
+
+
+def setup_logging(
+    log_file: str = "phantom_ranch_checker.log",
+    log_format: str = "text",
+    sample_rate: float = 1.0,
+) -> None:
+    """
+    Log to a rotating file and stdout, for this module and refresh_cookies.
+
+    In text mode records are written by the thread that logs them. In json
+    mode they are handed to a queue and written by a background thread as
+    JSON lines, and rotated files are gzip-compressed on that thread, so
+    polling threads never wait on the disk.
+
+    Args:
+        log_file: File to log to
+        log_format: "text" or "json"
+        sample_rate: Share of CHATTY lines to keep, from 0 to 1
+    """
+    if logger.handlers:
+        return
+    log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    # Use a rotating file handler
+    # Rotate logs when they reach 10MB, keep 5 backup logs
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=10 * 1024 * 1024, backupCount=5
+    )
+    file_handler.setFormatter(log_formatter)
+
+    # Also log to stdout
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(log_formatter)
+
+    if log_format == "json":
+        file_handler.setFormatter(JsonFormatter())
+        file_handler.namer = lambda name: name + ".gz"
+        file_handler.rotator = _gzip_rotator
+        queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, file_handler, stream_handler
+        )
+        listener.start()
+        # Drain the queue before the interpreter exits
+        atexit.register(listener.stop)
+        handlers = [queue_handler]
+    else:
+        handlers = [file_handler, stream_handler]
+
+    if sample_rate < 1.0:
+        for handler in handlers:
+            handler.addFilter(SampleFilter(sample_rate))
+    # The cookie refresher runs in-process and logs under its own module name
+    for target in (logger, logging.getLogger("refresh_cookies")):
+        target.setLevel(logging.INFO)
+        for handler in handlers:
+            target.addHandler(handler)
+        # Prevent duplicate logging to root logger if basicConfig was called elsewhere
+        target.propagate = False
+
+
+_numpy_module = None
+_numpy_checked = False
+
+
+def _numpy():
+    """NumPy, imported on first use, or None if it isn't installed."""
+    global _numpy_module, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+
+            _numpy_module = numpy
+        except ImportError:
+            # Optional: AvailabilityCalendar falls back to plain Python lists
+            pass
+        _numpy_checked = True
+    return _numpy_module
+
+
+class SMTPClient:
+    """A persistent, authenticated SMTP connection shared by all email sends."""
+
+    def __init__(
+        self,
+        smtp_server: str,
+        smtp_port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: float = 30,
+        noop_after: float = 60,
+    ):
+        """
+        Initialize the client. No connection is made until the first send.
+
+        Args:
+            smtp_server: SMTP server host
+            smtp_port: SMTP server port (default: 587)
+            username: Login username, or None to skip authentication
+            password: Login password
+            use_tls: Upgrade the connection with STARTTLS (default: True)
+            timeout: Socket timeout in seconds (default: 30)
+            noop_after: Idle seconds after which the connection is checked
+                with NOOP before reuse (default: 60)
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.noop_after = noop_after
+
+        self._server: Optional["smtplib.SMTP"] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> "smtplib.SMTP":
+        """Open, secure and authenticate a new connection."""
+        import smtplib
+
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()  # Enable TLS encryption
+            if self.username:
+                server.login(self.username, self.password)
+        except BaseException:
+            # Don't leak the socket of a connection that never became usable
+            server.close()
+            raise
+        logger.info(f"Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
+        return server
+
+    def _connection(self) -> "smtplib.SMTP":
+        """Return a live connection, reconnecting if the old one has dropped."""
+        import smtplib
+
+        if self._server is not None and time.time() - self._last_used > self.noop_after:
+            try:
+                code, _ = self._server.noop()
+                if code != 250:
+                    raise smtplib.SMTPServerDisconnected(f"NOOP returned {code}")
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def _disconnect(self) -> None:
+        """Drop the current connection, ignoring errors from a dead socket."""
+        if self._server is None:
+            return
+        import smtplib
+
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    def send(self, msg: "MIMEMultipart", recipients: List[str]) -> None:
+        """
+        Send a message to all recipients in a single SMTP transaction.
+
+        A connection that turns out to have dropped is reopened and the send
+        retried once.
+        """
+        import smtplib
+
+        with self._lock:
+            try:
+                self._connection().send_message(msg, to_addrs=recipients)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._disconnect()
+                self._connection().send_message(msg, to_addrs=recipients)
+            self._last_used = time.time()
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self._lock:
+            self._disconnect()
+
+
+class NotificationDispatcher:
+    """Deliver notifications on a background thread so polling never waits."""
+
+    def __init__(
+        self,
+        notification_manager: "NotificationManager",
+        channel_timeout: float = 60,
+        max_retries: int = 2,
+    ):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            notification_manager: Manager whose channels deliver the messages
+            channel_timeout: Seconds to wait for one channel send (default: 60)
+            max_retries: Extra attempts for a channel that fails (default: 2)
+        """
+        self.notification_manager = notification_manager
+        self.channel_timeout = channel_timeout
+        self.max_retries = max_retries
+
+        # Lower priority values are delivered first; the counter keeps
+        # messages of equal priority in submission order
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+        self._channels = ThreadPoolExecutor(thread_name_prefix="notify-channel")
+        self._thread = threading.Thread(
+            target=self._run, name="notify-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(
+        self, priority: int, title: str, message: str, sms_message=None, trace_id=None
+    ):
+        """Queue a notification for delivery."""
+        with self._counter_lock:
+            self._counter += 1
+            order = self._counter
+        self._queue.put((priority, order, (title, message, sms_message, trace_id)))
+
+    def _run(self):
+        """Deliver queued notifications until stopped."""
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._deliver(*job)
+            except Exception as e:
+                logger.error(f"Notification dispatch failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, title, message, sms_message, trace_id):
+        """
+        Send one notification through every channel in parallel.
+
+        Each attempt gets channel_timeout seconds; channels that fail are
+        retried up to max_retries times. A send that times out is not
+        retried, since it may still go through.
+        """
+        pending = self.notification_manager.channels(
+            title, message, sms_message, trace_id
+        )
+        for attempt in range(1 + self.max_retries):
+            futures = {
+                name: self._channels.submit(send) for name, send in pending.items()
+            }
+            deadline = time.monotonic() + self.channel_timeout
+            failed = {}
+            for name, future in futures.items():
+                try:
+                    if future.result(timeout=max(0, deadline - time.monotonic())):
+                        continue
+                except FutureTimeoutError:
+                    logger.error(
+                        f"{name} notification timed out after {self.channel_timeout}s"
+                    )
+                    continue
+                except Exception as e:
+                    logger.error(f"{name} notification failed: {e}")
+                failed[name] = pending[name]
+
+            if not failed:
+                return
+            pending = failed
+            if attempt < self.max_retries:
+                logger.warning(
+                    f"Retrying {', '.join(failed)} notification ({attempt + 1})"
+                )
+                time.sleep(2**attempt)
+
+    def close(self, timeout: float = 30):
+        """Deliver what is already queued (waiting up to timeout), then stop."""
+        self._queue.put((float("inf"), 0, None))
+        self._thread.join(timeout)
+        self._channels.shutdown(wait=False)
 
-load_dotenv("phantom-ranch.env")
+
+# SMS gateway domain for each supported carrier
+CARRIER_GATEWAYS = {
+    "verizon": "vtext.com",
+    "att": "txt.att.net",
+    "tmobile": "tmomail.net",
+    "sprint": "messaging.sprintpcs.com",
+    "cricket": "sms.cricketwireless.net",
+}
 
 
 class NotificationManager:
     """Class to handle various notification methods when availability is found."""
 
+    # Delivery order when notifications are dispatched in the background
+    PRIORITY_AVAILABILITY = 0
+    PRIORITY_ERROR = 1
+    PRIORITY_STATUS = 2
+
     def __init__(self, email_config=None, sms_config=None, enable_desktop=False):
         """
         Initialize the notification manager.
@@ -35,12 +422,30 @@ class NotificationManager:
         self.sms_config = sms_config
         self.enable_desktop = enable_desktop
 
-        # Check if desktop notifications are available
-        if self.enable_desktop:
-            self._check_desktop_notifications()
+        # Background delivery, started with start_dispatcher()
+        self.dispatcher = None
+
+        # Optional Tracer recording when each channel finishes sending
+        self.tracer = None
+
+        # Email and SMS-gateway messages share one SMTP connection
+        self.smtp_client = None
+        if self.email_config:
+            self.smtp_client = SMTPClient(
+                self.email_config.get("smtp_server"),
+                self.email_config.get("smtp_port", 587),
+                self.email_config.get("username"),
+                self.email_config.get("password"),
+                use_tls=self.email_config.get("use_tls", True),
+            )
+
+        # Desktop support is probed on first use; the probe runs a subprocess
+        self._desktop_checked = False
 
     def _check_desktop_notifications(self):
         """Check if desktop notifications are available on this system."""
+        import subprocess
+
         system = platform.system()
         if system == "Darwin":  # macOS
             try:
@@ -93,6 +498,11 @@ class NotificationManager:
 
     def send_desktop_notification(self, title, message):
         """Send a desktop notification."""
+        import subprocess
+
+        if self.enable_desktop and not self._desktop_checked:
+            self._desktop_checked = True
+            self._check_desktop_notifications()
         if not self.enable_desktop:
             return False
 
@@ -118,32 +528,30 @@ class NotificationManager:
 
     def send_email_notification(self, subject, message):
         """Send an email notification."""
-        if not self.email_config:
+        if not self.email_config or not self.email_config.get("to_email"):
             return False
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
 
         try:
+            # Several comma-separated recipients go out in one transaction
+            recipients = [
+                address.strip()
+                for address in self.email_config.get("to_email").split(",")
+                if address.strip()
+            ]
+
             # Create message
             msg = MIMEMultipart()
             msg["From"] = self.email_config.get("from_email")
-            msg["To"] = self.email_config.get("to_email")
+            msg["To"] = ", ".join(recipients)
             msg["Subject"] = subject
 
             # Attach message body
             msg.attach(MIMEText(message, "plain"))
 
-            # Connect to SMTP server
-            server = smtplib.SMTP(
-                self.email_config.get("smtp_server"),
-                self.email_config.get("smtp_port", 587),
-            )
-            server.starttls()  # Enable TLS encryption
-            server.login(
-                self.email_config.get("username"), self.email_config.get("password")
-            )
-
-            # Send email
-            server.send_message(msg)
-            server.quit()
+            # Send email over the shared connection
+            self.smtp_client.send(msg, recipients)
 
             logger.info(
                 f"Email notification sent to {self.email_config.get('to_email')}"
@@ -165,6 +573,8 @@ class NotificationManager:
         """Send a text message via email-to-SMS gateway."""
         if not self.sms_config or not self.email_config:
             return False
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
 
         try:
             # Create message
@@ -180,19 +590,8 @@ class NotificationManager:
             # Attach message body - keep it short for SMS
             msg.attach(MIMEText(message[:160], "plain"))  # Limit to 160 chars for SMS
 
-            # Connect to SMTP server
-            server = smtplib.SMTP(
-                self.email_config.get("smtp_server"),
-                self.email_config.get("smtp_port", 587),
-            )
-            server.starttls()  # Enable TLS encryption
-            server.login(
-                self.email_config.get("username"), self.email_config.get("password")
-            )
-
-            # Send email
-            server.send_message(msg)
-            server.quit()
+            # Send email over the shared connection
+            self.smtp_client.send(msg, [msg["To"]])
 
             logger.info(
                 f"SMS notification sent to {self.sms_config.get('phone_number')}"
@@ -202,184 +601,2538 @@ class NotificationManager:
             logger.error(f"Failed to send SMS notification: {e}")
             return False
 
-    def notify_all(self, title, message, sms_message=None):
-        """Send notifications through all configured channels."""
-        results = {}
+    def update_targets(self, email_to=None, phone_number=None, carrier=None):
+        """
+        Change who email and SMS notifications go to, e.g. on a config reload.
+
+        Each config dict is replaced rather than edited, so a send running on
+        the dispatcher thread sees either the old targets or the new ones.
+
+        Args:
+            email_to: New comma-separated email recipients
+            phone_number: New SMS phone number
+            carrier: New SMS carrier (a CARRIER_GATEWAYS key)
+        """
+        if email_to is not None:
+            if self.email_config:
+                self.email_config = {**self.email_config, "to_email": email_to}
+                logger.info(f"Email notifications now go to {email_to}")
+            else:
+                logger.warning("Email is not set up; ignoring new email recipients")
+
+        if phone_number is not None or carrier is not None:
+            if self.sms_config:
+                updated = dict(self.sms_config)
+                if phone_number is not None:
+                    updated["phone_number"] = phone_number
+                if carrier is not None:
+                    updated["carrier_gateway"] = CARRIER_GATEWAYS[carrier]
+                self.sms_config = updated
+                logger.info(f"SMS notifications now go to {updated['phone_number']}")
+            else:
+                logger.warning("SMS is not set up; ignoring new SMS settings")
+
+    def channels(self, title, message, sms_message=None, trace_id=None):
+        """Return a send callable for each configured channel."""
+        channels = {}
 
         # Desktop notification
         if self.enable_desktop:
-            results["desktop"] = self.send_desktop_notification(title, message)
+            channels["desktop"] = lambda: self.send_desktop_notification(
+                title, message
+            )
 
         # Email notification
         if self.email_config:
-            results["email"] = self.send_email_notification(title, message)
+            channels["email"] = lambda: self.send_email_notification(title, message)
 
         # SMS notification
         if self.sms_config:
             # Use shorter message for SMS if provided
             sms_text = sms_message if sms_message else message
-            results["sms"] = self.send_sms_notification(sms_text)
+            channels["sms"] = lambda: self.send_sms_notification(sms_text)
 
-        return results  #!/usr/bin/env python3
+        return {
+            name: self._timed(name, send, trace_id) for name, send in channels.items()
+        }
 
+    def _timed(self, name, send, trace_id=None):
+        """Wrap a channel send to record its duration and result."""
 
-"""
-Phantom Ranch Availability Checker
+        def timed_send():
+            started = time.perf_counter()
+            sent = send()
+            NOTIFICATION_SECONDS.observe(time.perf_counter() - started, channel=name)
+            NOTIFICATIONS.inc(channel=name, result="sent" if sent else "failed")
+            if self.tracer:
+                self.tracer.mark("channel_sent", trace_id, ch=name, ok=sent)
+            return sent
 
-This script continuously checks for accommodations availability at Phantom Ranch in the Grand Canyon.
-It will check ALL available dates by default and notify you when anything becomes available.
-"""
+        return timed_send
 
+    def notify_all(self, title, message, sms_message=None, trace_id=None):
+        """Send notifications through all configured channels."""
+        return {
+            name: send()
+            for name, send in self.channels(
+                title, message, sms_message, trace_id
+            ).items()
+        }
 
-# Configure logging
-log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-log_file = "phantom_ranch_checker.log"
+    def start_dispatcher(self, channel_timeout=60, max_retries=2):
+        """Deliver notifications passed to submit() on a background thread."""
+        if self.smtp_client:
+            # A stalled SMTP socket gives up within one attempt's timeout
+            # rather than holding the shared connection's lock
+            self.smtp_client.timeout = channel_timeout
+        self.dispatcher = NotificationDispatcher(self, channel_timeout, max_retries)
 
-# Use a rotating file handler
-# Rotate logs when they reach 10MB, keep 5 backup logs
-file_handler = logging.handlers.RotatingFileHandler(
-    log_file, maxBytes=10 * 1024 * 1024, backupCount=5
-)
-file_handler.setFormatter(log_formatter)
+    def submit(
+        self,
+        title,
+        message,
+        sms_message=None,
+        priority=PRIORITY_STATUS,
+        trace_id=None,
+    ):
+        """
+        Send a notification without blocking, if the dispatcher is running.
 
-# Also log to stdout
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(log_formatter)
+        Availability alerts should use PRIORITY_AVAILABILITY so they are
+        delivered ahead of queued error and status messages.
+        """
+        if self.dispatcher:
+            self.dispatcher.submit(priority, title, message, sms_message, trace_id)
+        else:
+            self.notify_all(title, message, sms_message, trace_id)
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
-# Prevent duplicate logging to root logger if basicConfig was called elsewhere
-logger.propagate = False
+    def close(self):
+        """Finish queued deliveries and close the shared SMTP connection."""
+        if self.dispatcher:
+            self.dispatcher.close()
+        if self.smtp_client:
+            self.smtp_client.close()
 
 
-class PhantomRanchChecker:
-    """Class to check Phantom Ranch availability and send notifications."""
 
-    BASE_URL = "https://secure.phantomranchlottery.com/phantom-ranch-lottery/availability/calendar"
+class Counter:
+    """A monotonically increasing metric, optionally split by labels."""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Return the series key for a set of label values."""
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        """Render a series key as a Prometheus label set."""
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Add to the series for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        """Return the metric in Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """A metric that can go up and down."""
+
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Set the series for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Counter):
+    """Distribution of observed values in cumulative buckets."""
+
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
 
     def __init__(
         self,
-        start_date: datetime,
-        end_date: datetime,
-        check_interval: int = 3600,
-        nights: int = 2,
-        people_per_room: int = 4,
-        cookies: Optional[str] = None,
-        notification_manager: Optional["NotificationManager"] = None,
+        name: str,
+        help_text: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
     ):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation in the series for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = self._format_labels(key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = self._format_labels(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {series[-2]}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for the /metrics endpoint."""
+
+    def __init__(self):
+        self.metrics: List[Counter] = []
+
+    def register(self, metric):
+        """Add a metric to the registry and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+REQUESTS = METRICS.register(
+    Counter(
+        "phantom_ranch_requests_total",
+        "Availability requests sent, by HTTP status",
+        ("status",),
+    )
+)
+REQUEST_SECONDS = METRICS.register(
+    Histogram(
+        "phantom_ranch_request_duration_seconds",
+        "Latency of availability requests",
+    )
+)
+CYCLE_SECONDS = METRICS.register(
+    Histogram(
+        "phantom_ranch_cycle_duration_seconds",
+        "Time to poll, diff and alert on one cycle of due windows",
+    )
+)
+WINDOWS_POLLED = METRICS.register(
+    Counter(
+        "phantom_ranch_windows_polled_total",
+        "Windows polled, by whether their response changed",
+        ("changed",),
+    )
+)
+NOTIFICATIONS = METRICS.register(
+    Counter(
+        "phantom_ranch_notifications_total",
+        "Notification sends, by channel and result",
+        ("channel", "result"),
+    )
+)
+NOTIFICATION_SECONDS = METRICS.register(
+    Histogram(
+        "phantom_ranch_notification_duration_seconds",
+        "Time to send a notification, by channel",
+        ("channel",),
+    )
+)
+CIRCUIT_OPEN = METRICS.register(
+    Gauge(
+        "phantom_ranch_circuit_open",
+        "1 while the circuit breaker is not closed",
+    )
+)
+SESSION_HEALTH = METRICS.register(
+    Gauge(
+        "phantom_ranch_session_health",
+        "Health score of each cookie session, from 0 to 1",
+        ("session",),
+    )
+)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the metrics registry at /metrics."""
+
+    def log_message(self, format, *args):
+        """Scrapes are frequent; keep them out of the checker log."""
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on a background thread."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """
+    Serve a running checker's state and accept commands, as JSON.
+
+    GET /state, /available, /windows and /sessions read the status the
+    checker publishes after each pass of its loop, so they never cause a
+    request to the site. POST /check (optionally with a JSON body of date,
+    nights and people) is matched against the published windows; the
+    matches, /pause and /resume are queued for the checker's loop, which is
+    woken to act on them.
+    """
+
+    def log_message(self, format, *args):
+        logger.debug(f"Control request: {format % args}")
+
+    def do_GET(self):
+        checker = self.server.checker
+        status = dict(checker.status)
+        status["paused"] = checker.paused
+        if self.path == "/state":
+            self._send_json(200, status)
+        elif self.path.lstrip("/") in ("available", "windows", "sessions"):
+            self._send_json(200, status.get(self.path.lstrip("/"), []))
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        checker = self.server.checker
+        if self.path == "/pause":
+            checker.pause()
+            self._send_json(200, {"paused": True})
+        elif self.path == "/resume":
+            checker.resume()
+            self._send_json(200, {"paused": False})
+        elif self.path == "/check":
+            try:
+                query = self._read_json()
+                check_date = query.get("date")
+                if check_date is not None:
+                    check_date = parse_result_date(str(check_date))
+                    if check_date is None:
+                        raise ValueError("Invalid date; use YYYY-MM-DD or MM/DD/YYYY")
+                windows = checker.request_check(
+                    check_date, query.get("nights"), query.get("people")
+                )
+            except (ValueError, TypeError, AttributeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            if not windows:
+                self._send_json(404, {"error": "No scheduled window matches"})
+                return
+            self._send_json(
+                202,
+                {
+                    "queued": [
+                        {"date": d.strftime("%Y-%m-%d"), "nights": n, "people": p}
+                        for d, n, p in windows
+                    ]
+                },
+            )
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        query = json.loads(self.rfile.read(length))
+        if not isinstance(query, dict):
+            raise ValueError("Expected a JSON object")
+        return query
+
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_control_server(
+    checker: "PhantomRanchChecker", port: int, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """Serve the control API for a checker on a background thread."""
+    server = ThreadingHTTPServer((host, port), ControlHandler)
+    server.daemon_threads = True
+    server.checker = checker
+    checker.publish_status = True
+    checker.refresh_status()
+    threading.Thread(
+        target=server.serve_forever, name="control-server", daemon=True
+    ).start()
+    logger.info(f"Serving the control API on http://{host}:{port}/")
+    return server
+
+
+class Tracer:
+    """Write timestamped pipeline events to a compact JSON-lines trace file."""
+
+    def __init__(self, trace_file: str = "phantom_ranch_trace.jsonl"):
         """
-        Initialize the checker with search parameters.
+        Open the trace file for appending.
 
         Args:
-            start_date: The earliest date to check
-            end_date: The latest date to check
-            check_interval: How often to check in seconds (default: 1 hour)
-            nights: Number of nights to stay (default: 2)
-            people_per_room: Number of people per room (default: 4)
-            cookies: Cookie string from a successful browser session
-            notification_manager: Optional NotificationManager for alerts
+            trace_file: Path of the trace file
         """
-        self.start_date = start_date
-        self.end_date = end_date
-        self.check_interval = check_interval
-        self.nights = nights
-        self.people_per_room = people_per_room
-        self.cookies = cookies
-        self.notification_manager = notification_manager
-
-        # Store the available dates we've found
-        self.available_dates = set()
+        self.trace_file = trace_file
+        self._file = open(trace_file, "a")
+        self._lock = threading.Lock()
+        # Millisecond start keeps ids unique across restarts
+        self._next_id = int(time.time() * 1000)
+        self.current: Optional[int] = None
+
+    def start_cycle(self) -> int:
+        """Begin a new trace for a check cycle and make it current."""
+        with self._lock:
+            self._next_id += 1
+            self.current = self._next_id
+        self.mark("cycle_start")
+        return self.current
+
+    def mark(self, event: str, trace_id: Optional[int] = None, **attrs) -> None:
+        """Record an event for a trace (default: the current cycle's)."""
+        trace_id = trace_id or self.current
+        if trace_id is None:
+            return
+        record = {"id": trace_id, "ev": event, "t": round(time.time(), 6), **attrs}
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            # Late events (e.g. sends drained at shutdown) are dropped once closed
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        """Write buffered events to disk."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the trace file."""
+        with self._lock:
+            self._file.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def summarize_trace(trace_file: str) -> str:
+    """
+    Summarize a trace file as latency percentiles for each pipeline stage.
+
+    Stages: request (sent to response received), parse (response to JSON
+    parsed), diff (cycle start to diff computed), coalesce (diff computed to
+    notify entered), send:<channel> (notify entered to channel sent) and
+    end_to_end:<channel> (cycle start to channel sent).
+    """
+    traces: Dict[int, List[Dict]] = {}
+    with open(trace_file, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            traces.setdefault(record["id"], []).append(record)
+
+    stages: Dict[str, List[float]] = {}
+
+    def add(stage, start, end):
+        if start is not None and end is not None:
+            stages.setdefault(stage, []).append(end - start)
+
+    for events in traces.values():
+        first = {}
+        sent = {}
+        received = {}
+        for event in events:
+            first.setdefault(event["ev"], event["t"])
+            # Several stays can start on the same date in one cycle
+            request = (event.get("w"), event.get("n"), event.get("p"))
+            if event["ev"] == "request_sent":
+                sent[request] = event["t"]
+            elif event["ev"] == "response_received":
+                received[request] = event["t"]
+                add("request", sent.get(request), event["t"])
+            elif event["ev"] == "json_parsed":
+                add("parse", received.get(request), event["t"])
+            elif event["ev"] == "channel_sent":
+                add(f"send:{event.get('ch')}", first.get("notify_entered"), event["t"])
+                add(f"end_to_end:{event.get('ch')}", first.get("cycle_start"), event["t"])
+        add("diff", first.get("cycle_start"), first.get("diff_computed"))
+        add("coalesce", first.get("diff_computed"), first.get("notify_entered"))
+
+    lines = [f"{'stage':<22} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"]
+    for stage, values in sorted(stages.items()):
+        values.sort()
+        lines.append(
+            f"{stage:<22} {len(values):>6} "
+            + " ".join(
+                f"{_percentile(values, q):>8.3f}s" for q in (0.5, 0.9, 0.99, 1.0)
+            )
+        )
+    return "\n".join(lines)
 
-        # Default headers for the request - these are important for authentication
-        self.headers = {
-            "accept": "*/*",
-            "accept-language": "en-US,en;q=0.9",
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "origin": "https://secure.phantomranchlottery.com",
-            "referer": "https://secure.phantomranchlottery.com/phantom-ranch-lottery/availability/check",
-            "sec-ch-ua": '"Chromium";v="136", "Google Chrome";v="136", "Not.A/Brand";v="99"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"Linux"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36",
-            "x-requested-with": "XMLHttpRequest",
-        }
 
-        # The traceparent and tracestate values can help with authentication
-        # In a real implementation you might need to update these
-        self.headers["traceparent"] = (
-            "00-471a9749bf000db57c8f4a6f0793de6a-d2f6eea960adb4be-01"
-        )
-        self.headers["tracestate"] = (
-            "657574@nr=0-1-657574-1134572858-d2f6eea960adb4be----1747836451074"
-        )
-        self.headers["newrelic"] = (
-            "eyJ2IjpbMCwxXSwiZCI6eyJ0eSI6IkJyb3dzZXIiLCJhYyI6IjY1NzU3NCIsImFwIjoiMTEzNDU3Mjg1OCIsImlkIjoiZDJmNmVlYTk2MGFkYjRiZSIsInRyIjoiNDcxYTk3NDliZjAwMGRiNTdjOGY0YTZmMDc5M2RlNmEiLCJ0aSI6MTc0NzgzNjQ1MTA3NH19"
-        )
-        self.headers["x-newrelic-id"] = "UgMAVFFXGwIAV1VXBQEBX1U="
+def _open_recording(path: str, mode: str):
+    """Open a recording as text, gzip-compressed when the path ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
 
-    def _format_date(self, date: datetime) -> str:
-        """Format a date for the API request."""
-        return date.strftime("%m/%d/%Y")
 
-    def _build_payload(self, check_date: datetime) -> str:
-        """Build the request payload for the given date."""
-        formatted_date = self._format_date(check_date)
+class ResponseRecorder:
+    """Append each availability request and its full response to a JSONL log."""
 
-        # Build room configuration - this matches the payload pattern in the example
-        # H4[] is empty, then H4[1][] has 3 values, then H4[2][] has 3 values for each night
-        room_config = ""
-        room_config += "&H4%5B%5D="
+    def __init__(self, recording_file: str):
+        """
+        Open the recording for appending.
 
-        for night in range(1, self.nights + 1):
-            room_config += f"&H4%5B{night}%5D%5B%5D={self.people_per_room}"
-            room_config += f"&H4%5B{night}%5D%5B%5D=0"
-            room_config += f"&H4%5B{night}%5D%5B%5D=0"
+        Args:
+            recording_file: Path of the recording (gzip-compressed if it ends in .gz)
+        """
+        self.recording_file = recording_file
+        self._file = _open_recording(recording_file, "a")
+        self._lock = threading.Lock()
+        self.cycle = 0
 
-        payload = f"date={formatted_date}&nights={self.nights}{room_config}"
-        return payload
+    def start_cycle(self) -> None:
+        """Mark the start of a check cycle; replay re-runs cycles as recorded."""
+        with self._lock:
+            self.cycle += 1
 
-    def check_availability(self, check_date: datetime) -> Dict:
+    def record(
+        self,
+        window: Tuple[str, int, int],
+        payload: str,
+        status: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
         """
-        Check availability starting from the given date.
+        Append one request and its response (or the error that replaced it).
 
         Args:
-            check_date: The date to check availability from
+            window: (MM/DD/YYYY start date, nights, people) of the request
+            payload: Form payload that was posted
+            status: HTTP status code
+            headers: Response headers worth replaying
+            body: Raw response body
+            error: Request exception message, when there was no response
+        """
+        record = {"t": round(time.time(), 3), "c": self.cycle, "w": window, "p": payload}
+        if error is None:
+            record.update({"s": status, "h": headers or {}, "b": body})
+        else:
+            record["e"] = error
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        """Write buffered records to disk."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the recording."""
+        with self._lock:
+            self._file.close()
+
+
+def load_recording(recording_file: str) -> List[Dict]:
+    """Read a recording written by ResponseRecorder, skipping torn lines."""
+    records = []
+    with _open_recording(recording_file, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
 
-        Returns:
-            Dict containing the API response
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Transport that answers availability requests from a recording."""
+
+    def __init__(self, records: List[Dict]):
         """
-        payload = self._build_payload(check_date)
+        Queue recorded responses by payload, in the order they were recorded.
 
-        try:
-            logger.info(
-                f"Checking availability for {self._format_date(check_date)} ({self.nights} nights)"
+        Args:
+            records: Records from load_recording()
+        """
+        super().__init__()
+        self._responses: Dict[str, deque] = {}
+        for record in records:
+            self._responses.setdefault(record["p"], deque()).append(record)
+
+    def send(self, request, **kwargs):
+        """Return the next recorded response for this request's payload."""
+        if request.method != "POST":
+            # Connection warming
+            return self._build_response(request, 200, {}, "")
+
+        pending = self._responses.get(request.body)
+        if not pending:
+            raise requests.exceptions.ConnectionError(
+                "No recorded response left for this request", request=request
             )
+        record = pending.popleft()
+        if "e" in record:
+            raise requests.exceptions.ConnectionError(record["e"], request=request)
+        return self._build_response(request, record["s"], record["h"], record["b"])
 
-            # Create a session with cookies if provided
-            session = requests.Session()
-            if self.cookies:
-                # Add cookies to the session
-                session.headers.update(self.headers)
+    @staticmethod
+    def _build_response(request, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response._content = body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
 
-                # The cookies parameter expects a dictionary, but we have a string
-                # We'll set it directly on the session
-                session.cookies.update(self._parse_cookie_string(self.cookies))
+    def close(self):
+        pass
 
-                response = session.post(self.BASE_URL, data=payload, timeout=30)
-            else:
-                # Fall back to regular request if no cookies provided
-                response = requests.post(
-                    self.BASE_URL, headers=self.headers, data=payload, timeout=30
+
+class Watch:
+    """One stay length, party size and date range to watch for availability."""
+
+    def __init__(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        nights: int = 2,
+        people_per_room: int = 4,
+        name: Optional[str] = None,
+    ):
+        """
+        Initialize the watch.
+
+        Args:
+            start_date: The earliest date to check
+            end_date: The latest date to check
+            nights: Number of nights to stay (default: 2)
+            people_per_room: Number of people per room (default: 4)
+            name: Label used in logs and notifications
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.nights = nights
+        self.people_per_room = people_per_room
+        self.name = name or f"{nights} night(s), {people_per_room} people"
+
+    @property
+    def group(self) -> Tuple[int, int]:
+        """Watches with the same (nights, people) share the same requests."""
+        return (self.nights, self.people_per_room)
+
+    def covers(self, date_str: str) -> bool:
+        """Whether a date key from the API falls inside this watch's range."""
+        day = parse_result_date(date_str)
+        if day is None:
+            # Can't tell, so don't risk hiding a result
+            return True
+        return self.start_date.date() <= day <= self.end_date.date()
+
+
+class CoveragePlanner:
+    """Plan window requests from the date span the API actually returns."""
+
+    def __init__(self, default_span_days: int = 30, history: int = 5):
+        """
+        Initialize the planner.
+
+        Args:
+            default_span_days: Stride to use until a response has been seen
+                (default: 30, the historical fixed stride)
+            history: Number of recent responses the learned span is based on
+        """
+        self.default_span_days = default_span_days
+        self.span_days: Optional[int] = None
+        self._recent_spans = deque(maxlen=history)
+
+        # Set when responses got shorter than the stride in use, which means
+        # the current windows leave gaps until the new plan has been polled
+        self.span_shrank = False
+        # Windows whose coverage has already been measured
+        self._observed_windows = set()
+
+    def observe(
+        self, check_date: datetime, response: Dict, unchanged: bool = False
+    ) -> None:
+        """
+        Learn the span covered by a successful response.
+
+        The span runs from the requested date to the end of the first run of
+        consecutive days in `results`. The smallest span among recent
+        responses is used for planning so a shrinking server span never
+        leaves gaps.
+        """
+        if unchanged and check_date in self._observed_windows:
+            return
+
+        first_day = check_date.date()
+        days = set()
+        for date_str in response.get("results", {}):
+            day = parse_result_date(date_str)
+            if day is not None and day >= first_day:
+                days.add(day)
+
+        if not days:
+            return
+
+        last_day = min(days)
+        while last_day + timedelta(days=1) in days:
+            last_day += timedelta(days=1)
+        self._observed_windows.add(check_date)
+
+        span = (last_day - first_day).days + 1
+        self._recent_spans.append(span)
+        learned_span = min(self._recent_spans)
+        if learned_span != self.span_days:
+            logger.info(
+                f"API responses cover {learned_span} days; planning windows to match"
+            )
+            if learned_span < (self.span_days or self.default_span_days):
+                self.span_shrank = True
+            self.span_days = learned_span
+
+    def plan(self, start_date: datetime, end_date: datetime) -> List[datetime]:
+        """Return the fewest request dates that cover [start_date, end_date]."""
+        stride = timedelta(days=self.span_days or self.default_span_days)
+        dates = []
+        current_date = start_date
+        while current_date <= end_date:
+            dates.append(current_date)
+            current_date += stride
+        return dates
+
+    def take_span_shrank(self) -> bool:
+        """Return whether the span shrank since the last call, and reset it."""
+        shrank, self.span_shrank = self.span_shrank, False
+        return shrank
+
+    def requests_saved(self, start_date: datetime, end_date: datetime) -> int:
+        """Requests per cycle saved compared to the fixed 30-day stride."""
+        fixed = len(CoveragePlanner().plan(start_date, end_date))
+        return fixed - len(self.plan(start_date, end_date))
+
+
+class PollScheduler:
+    """Decide when each window is next due to be polled."""
+
+    def __init__(
+        self,
+        check_interval: float,
+        proximity: bool = False,
+        half_life_days: float = 30.0,
+        min_period: float = 60.0,
+        max_period_factor: float = 12.0,
+    ):
+        """
+        Initialize the scheduler.
+
+        With proximity polling off, every window is polled once per
+        check_interval. With it on, each window gets its own period from how
+        soon its dates are and how often it has recently changed. The periods
+        are scaled so the total request rate stays at one poll per window per
+        check_interval.
+
+        Args:
+            check_interval: Seconds between polls of a window, on average
+            proximity: Weight polling towards near-term, churning windows
+            half_life_days: Days out at which a window's weight halves
+            min_period: Shortest period any window is polled at, in seconds
+            max_period_factor: Longest period, as a multiple of check_interval
+        """
+        self.check_interval = check_interval
+        self.proximity = proximity
+        self.half_life_days = half_life_days
+        self.min_period = min_period
+        self.max_period_factor = max_period_factor
+
+        self._next_due: Dict[Tuple[datetime, int, int], float] = {}
+        self.last_polled: Dict[Tuple[datetime, int, int], float] = {}
+        # Recent-change rate per window, as an exponentially weighted average
+        self._churn: Dict[Tuple[datetime, int, int], float] = {}
+
+    def update_windows(
+        self,
+        window_requests: List[Tuple[datetime, int, int]],
+        urgent_groups: Optional[set] = None,
+    ) -> None:
+        """
+        Replace the set of windows to poll.
+
+        New windows are due with the soonest existing window, or straight
+        away if their (nights, people) group is in urgent_groups.
+        """
+        now = time.time()
+        soonest = min(self._next_due.values(), default=now)
+        next_due = {}
+        for request in window_requests:
+            if request in self._next_due:
+                next_due[request] = self._next_due[request]
+            elif urgent_groups and request[1:] in urgent_groups:
+                next_due[request] = now
+            else:
+                next_due[request] = soonest
+        self._next_due = next_due
+
+    def due(self) -> List[Tuple[datetime, int, int]]:
+        """Return the windows that are due now, in date order."""
+        now = time.time()
+        return sorted(r for r, due_at in self._next_due.items() if due_at <= now)
+
+    def windows(self) -> List[Tuple[datetime, int, int]]:
+        """Return the windows currently scheduled, in date order."""
+        return sorted(self._next_due)
+
+    def next_due(self, request: Tuple[datetime, int, int]) -> Optional[float]:
+        """When a window is next due (epoch seconds), or None if unscheduled."""
+        return self._next_due.get(request)
+
+    def poll_now(self, window_requests: Optional[List] = None) -> None:
+        """Make the given windows (default: all) due immediately."""
+        now = time.time()
+        for request in window_requests or list(self._next_due):
+            if request in self._next_due:
+                self._next_due[request] = now
+
+    def reschedule(self) -> None:
+        """Bring forward windows that a shorter period now makes due sooner."""
+        for request, due_at in self._next_due.items():
+            if request in self.last_polled:
+                self._next_due[request] = min(
+                    due_at, self.last_polled[request] + self.period(request)
+                )
+
+    def seconds_until_next(self) -> float:
+        """Seconds until the next window is due."""
+        if not self._next_due:
+            return float(self.check_interval)
+        return max(0.0, min(self._next_due.values()) - time.time())
+
+    def record(self, request: Tuple[datetime, int, int], changed: bool) -> None:
+        """Record a poll of a window and schedule its next one."""
+        now = time.time()
+        self.last_polled[request] = now
+        churn = self._churn.get(request, 0.0)
+        self._churn[request] = 0.7 * churn + 0.3 * (1.0 if changed else 0.0)
+        if request in self._next_due:
+            self._next_due[request] = now + self.period(request)
+
+    def _weight(self, request: Tuple[datetime, int, int], today: date) -> float:
+        """Relative polling weight: higher for sooner and busier windows."""
+        days_out = max(0, (request[0].date() - today).days)
+        proximity = 1.0 / (1.0 + days_out / self.half_life_days)
+        return proximity * (1.0 + self._churn.get(request, 0.0))
+
+    def period(self, request: Tuple[datetime, int, int]) -> float:
+        """Seconds between polls of a window."""
+        if not self.proximity:
+            return float(self.check_interval)
+
+        today = datetime.now().date()
+        weights = [self._weight(r, today) for r in self._next_due]
+        mean_weight = sum(weights) / len(weights)
+        # A window of average weight is polled once per check_interval
+        period = self.check_interval * mean_weight / self._weight(request, today)
+        return min(
+            max(period, self.min_period),
+            self.check_interval * self.max_period_factor,
+        )
+
+
+class CircuitBreaker:
+    """Back off from a failing server, and stop polling it while it's down."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 1800.0,
+    ):
+        """
+        Initialize the breaker.
+
+        Each failure delays the next request by an exponentially growing,
+        jittered amount (or the server's Retry-After, if longer). After
+        failure_threshold failures in a row the breaker opens and no requests
+        are sent until the delay passes; then a single probe request is let
+        through (half-open). A successful probe closes the breaker again.
+
+        Args:
+            failure_threshold: Consecutive failures before the breaker opens
+            base_delay: Delay after the first failure, in seconds
+            max_delay: Upper bound on any delay, in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._allowed_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _backoff_delay(self) -> float:
+        """Exponential delay for the current failure count, with jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        # Keep at least half the delay so retries can't bunch up at zero
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def try_acquire(self) -> bool:
+        """Return whether a request may be sent now."""
+        with self._lock:
+            if time.time() < self._allowed_at:
+                return False
+            if self.state == self.OPEN:
+                self.state = self.HALF_OPEN
+                logger.info("Circuit breaker half-open: sending a probe request")
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """Record a successful request."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed: resuming normal polling")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._allowed_at = 0.0
+            self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        """Record a failed request, honouring the server's Retry-After."""
+        with self._lock:
+            self.failures += 1
+            delay = self._backoff_delay()
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+            self._allowed_at = time.time() + delay
+            self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                logger.warning(
+                    f"Circuit breaker re-opened: probe failed, pausing requests for {delay:.0f}s"
+                )
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                logger.warning(
+                    f"Circuit breaker opened after {self.failures} consecutive failures; "
+                    f"pausing requests for {delay:.0f}s"
+                )
+            else:
+                logger.info(f"Backing off {delay:.1f}s after failure {self.failures}")
+
+    def seconds_until_allowed(self) -> float:
+        """Seconds until the next request may be sent."""
+        return max(0.0, self._allowed_at - time.time())
+
+
+class AlertCoalescer:
+    """Collect newly available dates so one alert covers a whole cycle."""
+
+    def __init__(self, debounce: float = 0.0):
+        """
+        Initialize the coalescer.
+
+        Args:
+            debounce: Seconds to keep collecting after the first new date
+                before alerting; 0 alerts at the end of each cycle. This is
+                also the longest a discovery waits before it is sent.
+        """
+        self.debounce = debounce
+        self._pending: Dict[Tuple[int, int], List[str]] = {}
+        self._first_at: Optional[float] = None
+        # Trace of the cycle that found the first pending date
+        self.trace_id: Optional[int] = None
+
+    def add(
+        self,
+        dates: List[str],
+        nights: int,
+        people: int,
+        trace_id: Optional[int] = None,
+    ) -> None:
+        """Queue newly available dates for the next alert."""
+        if not dates:
+            return
+        if self._first_at is None:
+            self._first_at = time.time()
+            self.trace_id = trace_id
+        self._pending.setdefault((nights, people), []).extend(dates)
+
+    def seconds_until_due(self) -> float:
+        """Seconds until pending dates must be sent (inf if none are pending)."""
+        if self._first_at is None:
+            return float("inf")
+        return max(0.0, self._first_at + self.debounce - time.time())
+
+    def due(self) -> bool:
+        """Whether pending dates should be sent now."""
+        return self._first_at is not None and self.seconds_until_due() <= 0
+
+    def empty(self) -> bool:
+        """Whether no dates are waiting to be sent."""
+        return self._first_at is None
+
+    def take(self) -> Dict[Tuple[int, int], List[str]]:
+        """Return and clear the pending dates."""
+        pending, self._pending, self._first_at = self._pending, {}, None
+        return pending
+
+
+class AvailabilityStore:
+    """Durable record of availability per (date, nights, people) in SQLite."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS availability (
+            stay_date TEXT NOT NULL,
+            nights INTEGER NOT NULL,
+            people INTEGER NOT NULL,
+            available INTEGER NOT NULL,
+            changed_at REAL NOT NULL,
+            PRIMARY KEY (stay_date, nights, people)
+        );
+        CREATE INDEX IF NOT EXISTS availability_open
+            ON availability (available, nights, people);
+        CREATE TABLE IF NOT EXISTS transitions (
+            id INTEGER PRIMARY KEY,
+            stay_date TEXT NOT NULL,
+            nights INTEGER NOT NULL,
+            people INTEGER NOT NULL,
+            available INTEGER NOT NULL,
+            at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transitions_by_stay
+            ON transitions (stay_date, nights, people, at);
+        CREATE TABLE IF NOT EXISTS errors (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            consecutive INTEGER NOT NULL,
+            error TEXT NOT NULL,
+            at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS cursors (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, db_file: str = "phantom_ranch_state.db"):
+        """
+        Open (or create) the state database.
+
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        self.db_file = db_file
+        # Shard workers share the database; wait out each other's writes
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        # WAL keeps the per-cycle commit cheap and lets readers run alongside
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+        # Transitions recorded during the current cycle, written by flush()
+        self._pending: List[Tuple[str, int, int, int, float]] = []
+
+    def load_available(self, as_of: Optional[int] = None) -> Dict[Tuple[int, int], set]:
+        """
+        Return the available dates, per (nights, people) group.
+
+        Args:
+            as_of: Only count transitions up to this id (default: the current
+                availability)
+        """
+        available: Dict[Tuple[int, int], set] = {}
+        if as_of is None:
+            rows = self.conn.execute(
+                "SELECT stay_date, nights, people FROM availability WHERE available = 1"
+            )
+        else:
+            # Each stay's latest transition up to as_of
+            rows = self.conn.execute(
+                "SELECT stay_date, nights, people FROM transitions AS t "
+                "WHERE available = 1 AND id = ("
+                "SELECT MAX(id) FROM transitions WHERE stay_date = t.stay_date "
+                "AND nights = t.nights AND people = t.people AND id <= ?)",
+                (as_of,),
+            )
+        for stay_date, nights, people in rows:
+            available.setdefault((nights, people), set()).add(stay_date)
+        return available
+
+    def record(self, stay_date: str, nights: int, people: int, available: bool) -> None:
+        """Queue an availability transition to be written on the next flush."""
+        self._pending.append((stay_date, nights, people, int(available), time.time()))
+
+    def flush(self) -> None:
+        """Write all queued transitions in a single transaction."""
+        if not self._pending:
+            return
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO transitions (stay_date, nights, people, available, at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO availability "
+                "(stay_date, nights, people, available, changed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def last_transition_id(self) -> int:
+        """Id of the newest transition, or 0 if there are none."""
+        row = self.conn.execute("SELECT MAX(id) FROM transitions").fetchone()
+        return row[0] or 0
+
+    def record_error(self, source: str, consecutive: int, error: str) -> None:
+        """
+        Write a run of errors for the ShardLeader to notify about.
+
+        Args:
+            source: Process that hit them (e.g. "shard-2")
+            consecutive: Consecutive errors so far
+            error: Last error message
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO errors (source, consecutive, error, at) VALUES (?, ?, ?, ?)",
+                (source, consecutive, error, time.time()),
+            )
+
+    def get_cursor(self, name: str) -> Optional[int]:
+        """Return the transition id saved under a name, or None if there is none."""
+        row = self.conn.execute(
+            "SELECT last_id FROM cursors WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, name: str, last_id: int) -> None:
+        """Save a transition id under a name."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors (name, last_id) VALUES (?, ?)",
+                (name, last_id),
+            )
+
+    def last_error_id(self) -> int:
+        """Id of the newest error, or 0 if there are none."""
+        row = self.conn.execute("SELECT MAX(id) FROM errors").fetchone()
+        return row[0] or 0
+
+    def errors_since(self, after_id: int) -> List[Tuple[int, str, int, str]]:
+        """
+        Return errors written after the given id, oldest first.
+
+        Args:
+            after_id: Last error id already seen
+
+        Returns:
+            (id, source, consecutive, error) rows
+        """
+        return self.conn.execute(
+            "SELECT id, source, consecutive, error FROM errors WHERE id > ? ORDER BY id",
+            (after_id,),
+        ).fetchall()
+
+    def transitions_since(
+        self, after_id: int
+    ) -> List[Tuple[int, str, int, int, int, float]]:
+        """
+        Return transitions written after the given id, oldest first.
+
+        Args:
+            after_id: Last transition id already seen
+
+        Returns:
+            (id, stay_date, nights, people, available, at) rows
+        """
+        return self.conn.execute(
+            "SELECT id, stay_date, nights, people, available, at FROM transitions "
+            "WHERE id > ? ORDER BY id",
+            (after_id,),
+        ).fetchall()
+
+    def close(self) -> None:
+        """Flush any queued transitions and close the database."""
+        self.flush()
+        self.conn.close()
+
+
+class EventLog:
+    """
+    Append-only JSON-lines log of dates opening and closing.
+
+    Each line is {"t": unix time, "d": stay date (YYYY-MM-DD), "n": nights,
+    "p": people, "a": 1 opened / 0 closed}, written in time order: a time
+    earlier than the last one written is moved up to it. The file
+    stays open; flush() writes each cycle's events and fsyncs at most every
+    fsync_interval seconds, so durability costs one fsync per batch rather
+    than one per event. Read it back with read_events().
+    """
+
+    def __init__(
+        self, event_file: str = "phantom_ranch_events.jsonl", fsync_interval: float = 5.0
+    ):
+        """
+        Open the event log for appending.
+
+        Args:
+            event_file: Path of the log
+            fsync_interval: Minimum seconds between fsyncs
+        """
+        self.event_file = event_file
+        self.fsync_interval = fsync_interval
+        self._file = open(event_file, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._synced_at = time.monotonic()
+        self._unsynced = False
+        self._last_t = 0.0
+
+    def record(
+        self,
+        stay_date: str,
+        nights: int,
+        people: int,
+        available: bool,
+        at: Optional[float] = None,
+    ) -> None:
+        """
+        Append one opening or closing; written on the next flush().
+
+        Args:
+            stay_date: Date that changed
+            nights: Nights in the stay
+            people: People per room
+            available: Whether it opened
+            at: Unix time it was seen (default: now)
+        """
+        parsed = parse_result_date(stay_date)
+        with self._lock:
+            # read_events() binary-searches on time, so it must never go back
+            self._last_t = max(self._last_t, round(time.time() if at is None else at, 3))
+            event = {
+                "t": self._last_t,
+                "d": parsed.isoformat() if parsed else stay_date,
+                "n": nights,
+                "p": people,
+                "a": int(available),
+            }
+            self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._unsynced = True
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Write buffered events, fsyncing if fsync_interval has passed.
+
+        Args:
+            force: fsync regardless of the interval
+        """
+        with self._lock:
+            if not self._unsynced:
+                return
+            self._file.flush()
+            now = time.monotonic()
+            if force or now - self._synced_at >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._synced_at = now
+                self._unsynced = False
+
+    def close(self) -> None:
+        """Flush, fsync and close the log."""
+        self.flush(force=True)
+        with self._lock:
+            self._file.close()
+
+
+def _seek_line(f, position: int) -> None:
+    """Move to the first line start at or after `position` in an event log."""
+    f.seek(max(position - 1, 0))
+    if position:
+        # Reading through the newline before `position` lands on a line start
+        f.readline()
+
+
+def read_events(
+    event_file: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    nights: Optional[int] = None,
+    people: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """
+    Yield matching events from an EventLog file, oldest first.
+
+    The log is in time order, so `since` is found by binary search on file
+    offsets and the scan stops at `until`; only that slice is read. Lines for
+    other stay dates, nights or party sizes are skipped before being decoded.
+
+    Args:
+        event_file: Log written by EventLog
+        start: Earliest stay date
+        end: Latest stay date
+        nights: Only this stay length
+        people: Only this party size
+        since: Earliest event time (unix seconds)
+        until: Latest event time (unix seconds)
+
+    Yields:
+        Event dicts with keys t, d, n, p and a
+    """
+    start_key = start.isoformat().encode() if start else None
+    end_key = end.isoformat().encode() if end else None
+    nights_key = f'"n":{nights},'.encode() if nights is not None else None
+    people_key = f'"p":{people},'.encode() if people is not None else None
+
+    with open(event_file, "rb") as f:
+        position = 0
+        if since is not None:
+            # Smallest offset whose next line is at or after `since`
+            low, high = 0, os.fstat(f.fileno()).st_size
+            while low < high:
+                middle = (low + high) // 2
+                _seek_line(f, middle)
+                line = f.readline()
+                try:
+                    before = line and json.loads(line)["t"] < since
+                except (ValueError, KeyError):
+                    before = False  # Torn line: scan from here to be safe
+                if before:
+                    low = middle + 1
+                else:
+                    high = middle
+            position = low
+        _seek_line(f, position)
+
+        for line in f:
+            if nights_key and nights_key not in line:
+                continue
+            if people_key and people_key not in line:
+                continue
+            if start_key or end_key:
+                offset = line.find(b'"d":"') + 5
+                stay_date = line[offset : offset + 10]
+                if start_key and stay_date < start_key:
+                    continue
+                if end_key and stay_date > end_key:
+                    continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # Torn last line
+            if since is not None and event["t"] < since:
+                continue
+            if until is not None and event["t"] > until:
+                return
+            yield event
+
+
+class AvailabilityCalendar:
+    """
+    Per-day availability indexed by day offset from an origin date.
+
+    Backed by a NumPy bool array when NumPy is installed, otherwise by a
+    list of bools with the same behaviour. The calendar grows as later dates
+    are seen; dates before the origin are ignored.
+    """
+
+    def __init__(self, origin: date):
+        """
+        Initialize an empty calendar.
+
+        Args:
+            origin: Date at offset 0
+        """
+        self.origin = origin
+        numpy = _numpy()
+        self.days = numpy.zeros(0, dtype=bool) if numpy is not None else []
+
+    def _grow(self, length: int) -> None:
+        if length <= len(self.days):
+            return
+        numpy = _numpy()
+        if numpy is not None:
+            self.days = numpy.concatenate(
+                (self.days, numpy.zeros(length - len(self.days), dtype=bool))
+            )
+        else:
+            self.days.extend([False] * (length - len(self.days)))
+
+    def update(self, results: Dict) -> None:
+        """
+        Set the availability of the dates in an API `results` map.
+
+        Args:
+            results: Date string to available flag
+        """
+        offsets = []
+        values = []
+        for date_str, available in results.items():
+            stay_date = parse_result_date(date_str)
+            if stay_date is None or stay_date < self.origin:
+                continue
+            offsets.append((stay_date - self.origin).days)
+            values.append(bool(available))
+        if not offsets:
+            return
+
+        self._grow(max(offsets) + 1)
+        if _numpy() is not None:
+            self.days[offsets] = values
+        else:
+            for offset, value in zip(offsets, values):
+                self.days[offset] = value
+
+    def stays(self, nights: int):
+        """
+        Which days start a run of `nights` consecutive available nights.
+
+        Returns:
+            Bools indexed by start offset; runs past the known days are False
+        """
+        numpy = _numpy()
+        if numpy is not None:
+            # Sliding-window sum over a prefix sum: a full window is a full run
+            counts = numpy.concatenate(([0], numpy.cumsum(self.days, dtype=numpy.int32)))
+            full = (counts[nights:] - counts[:-nights]) == nights
+            # The last nights - 1 days (or all of them, if fewer are known)
+            # can't start a full run
+            tail = numpy.zeros(min(nights - 1, len(self.days)), dtype=bool)
+            return numpy.concatenate((full, tail))
+
+        stays = []
+        run = 0
+        # Walk backwards counting the available run starting at each day
+        for available in reversed(self.days):
+            run = run + 1 if available else 0
+            stays.append(run >= nights)
+        stays.reverse()
+        return stays
+
+    @staticmethod
+    def diff(previous, current) -> Tuple[List[int], List[int]]:
+        """
+        Compare two stays() results.
+
+        Args:
+            previous: Earlier result (may be shorter than current)
+            current: Latest result
+
+        Returns:
+            (offsets that opened, offsets that closed)
+        """
+        numpy = _numpy()
+        if numpy is not None:
+            padded = numpy.zeros(len(current), dtype=bool)
+            padded[: len(previous)] = previous
+            changed = padded ^ current
+            return (
+                numpy.flatnonzero(changed & current).tolist(),
+                numpy.flatnonzero(changed & padded).tolist(),
+            )
+
+        opened = []
+        closed = []
+        for offset, available in enumerate(current):
+            was = previous[offset] if offset < len(previous) else False
+            if available != was:
+                (opened if available else closed).append(offset)
+        return opened, closed
+
+    def date_at(self, offset: int) -> str:
+        """Date string (YYYY-MM-DD) of a day offset."""
+        return (self.origin + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+class ResponseCache:
+    """Fingerprint each window's response body so unchanged windows skip work."""
+
+    def __init__(self):
+        # request key -> (body fingerprint, parsed response)
+        self._entries: Dict[Tuple[datetime, int, int], Tuple[str, Dict]] = {}
+        # request key -> results from before the latest change, until consumed
+        self._pending: Dict[Tuple[datetime, int, int], Dict] = {}
+
+    @staticmethod
+    def fingerprint(body: bytes) -> str:
+        """Return a short digest of a raw response body."""
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def lookup(self, key: Tuple[datetime, int, int], digest: str) -> Optional[Dict]:
+        """Return the cached response if the body is unchanged, else None."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+        return None
+
+    def store(self, key: Tuple[datetime, int, int], digest: str, response: Dict) -> None:
+        """Cache a changed response and remember the results it replaced."""
+        entry = self._entries.get(key)
+        if key not in self._pending:
+            self._pending[key] = entry[1].get("results", {}) if entry else {}
+        self._entries[key] = (digest, response)
+
+    def take_changes(self, key: Tuple[datetime, int, int]) -> Optional[Dict]:
+        """
+        Return the results that changed since the window was last processed.
+
+        Returns None when the window is unchanged, otherwise a dict holding
+        only the dates whose value differs from the previous response.
+        """
+        if key not in self._pending:
+            return None
+        previous = self._pending.pop(key)
+        results = self._entries[key][1].get("results", {})
+        return {
+            date_str: available
+            for date_str, available in results.items()
+            if previous.get(date_str) != available
+        }
+
+    def clear(self) -> None:
+        """Forget all fingerprints so every window is processed in full."""
+        self._entries.clear()
+        self._pending.clear()
+
+    def forget(self, groups: set) -> None:
+        """Forget the fingerprints of windows in the given (nights, people) groups."""
+        for key in [key for key in self._entries if key[1:] in groups]:
+            del self._entries[key]
+            self._pending.pop(key, None)
+
+
+class RequestPlan:
+    """
+    Prepared availability requests, built once and reused every cycle.
+
+    Preparing a request encodes its headers, cookies and body. None of those
+    change between cycles unless the session's headers or cookies, the URL,
+    or the set of windows change, so prepared requests are cached per window
+    and all of them are thrown away when any of those inputs changes.
+
+    The full comparison runs once per cycle, in compile(). Between cycles,
+    get() only notices a new session, URL or swapped-in cookie jar, so
+    cookies set by responses mid-cycle are picked up by the next cycle.
+    """
+
+    def __init__(self, build_payload):
+        """
+        Initialize an empty plan.
+
+        Args:
+            build_payload: Callable(check_date, nights, people) returning the form body
+        """
+        self.build_payload = build_payload
+        self._inputs = None
+        # Cheap identity check for get(): (session, cookie jar, url)
+        self._identity = None
+        self._prepared: Dict[Tuple[datetime, int, int], requests.PreparedRequest] = {}
+        self._send_kwargs: Dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _inputs_key(session: requests.Session, url: str) -> Tuple:
+        """Everything besides the window that goes into a prepared request."""
+        jar = session.cookies
+        # Responses on other threads add cookies to the jar while we read it;
+        # the jar's own lock keeps iteration from seeing it change size
+        with jar._cookies_lock:
+            cookies = [(c.domain, c.path, c.name, c.value or "") for c in jar]
+        return (id(session), url, tuple(session.headers.items()), tuple(sorted(cookies)))
+
+    def _check_inputs(self, session: requests.Session, url: str) -> None:
+        """Drop every prepared request if the session or URL changed."""
+        self._identity = (id(session), id(session.cookies), url)
+        inputs = self._inputs_key(session, url)
+        if inputs != self._inputs:
+            if self._inputs is not None:
+                logger.debug("Request inputs changed; rebuilding the request plan")
+            self._inputs = inputs
+            self._prepared = {}
+            # Proxy and certificate settings from the environment, as post() would
+            self._send_kwargs = session.merge_environment_settings(
+                url, {}, None, None, None
+            )
+
+    def _prepare(
+        self, session: requests.Session, url: str, window: Tuple[datetime, int, int]
+    ) -> requests.PreparedRequest:
+        prepared = self._prepared.get(window)
+        if prepared is None:
+            prepared = session.prepare_request(
+                requests.Request("POST", url, data=self.build_payload(*window))
+            )
+            self._prepared[window] = prepared
+        return prepared
+
+    def compile(
+        self,
+        session: requests.Session,
+        url: str,
+        window_requests: List[Tuple[datetime, int, int]],
+    ) -> None:
+        """
+        Prepare every request a cycle will make, reusing unchanged ones.
+
+        Args:
+            session: Session the requests will be sent with
+            url: Availability endpoint
+            window_requests: (start date, nights, people) windows in the cycle
+        """
+        with self._lock:
+            self._check_inputs(session, url)
+            self._prepared = {
+                window: self._prepare(session, url, window)
+                for window in window_requests
+            }
+
+    def get(
+        self, session: requests.Session, url: str, window: Tuple[datetime, int, int]
+    ) -> Tuple[requests.PreparedRequest, Dict]:
+        """
+        Return a ready-to-send request for one window and the send() options.
+
+        Args:
+            session: Session the request will be sent with
+            url: Availability endpoint
+            window: (start date, nights, people) to request
+
+        Returns:
+            (prepared request, keyword arguments for session.send)
+        """
+        with self._lock:
+            if (id(session), id(session.cookies), url) != self._identity:
+                self._check_inputs(session, url)
+            # A copy, so hooks and redirects can't alter the cached request
+            return self._prepare(session, url, window).copy(), self._send_kwargs
+
+
+class PooledSession:
+    """One cookie set's HTTP session, its request plan and its health."""
+
+    def __init__(self, name: str, session: requests.Session, plan: RequestPlan):
+        """
+        Initialize a healthy session.
+
+        Args:
+            name: Label for logs and metrics (e.g. the cookie file name)
+            session: HTTP session carrying this cookie set
+            plan: Prepared requests for this session
+        """
+        self.name = name
+        self.session = session
+        self.plan = plan
+        self.health = 1.0
+        # Smoothed request latency in seconds, once known
+        self.latency: Optional[float] = None
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.challenges = 0
+        # Smooth weighted round-robin state
+        self._current_weight = 0.0
+
+    @property
+    def score(self) -> float:
+        """Health discounted by latency; requests are spread in proportion."""
+        return self.health / (1.0 + (self.latency or 0.0))
+
+
+class SessionPool:
+    """
+    Spread requests across cookie sessions in proportion to their health.
+
+    Each success nudges a session's health towards 1 and each failure cuts
+    it. A challenge (401, 403, 429 or a non-JSON page) cuts it harder and
+    rests the session for a while, as does health falling below
+    MIN_HEALTH. A rested session gets requests again afterwards, so it can
+    earn its health back. If every session is resting, the healthiest is
+    used anyway.
+    """
+
+    MIN_HEALTH = 0.3
+    ERROR_COOLDOWN = 60
+    CHALLENGE_COOLDOWN = 300
+    CHALLENGE_STATUSES = (401, 403, 429)
+
+    def __init__(self, sessions: List[PooledSession]):
+        """
+        Initialize the pool.
+
+        Args:
+            sessions: Sessions to use, at least one
+        """
+        self.sessions = sessions
+        self._lock = threading.Lock()
+        # Called with the session whenever one is challenged
+        self.on_challenge = None
+        for pooled in sessions:
+            SESSION_HEALTH.set(pooled.health, session=pooled.name)
+
+    def acquire(self) -> PooledSession:
+        """Pick the session for the next request."""
+        with self._lock:
+            now = time.monotonic()
+            ready = [s for s in self.sessions if now >= s.cooldown_until]
+            if not ready:
+                return max(self.sessions, key=lambda s: s.score)
+            if len(ready) == 1:
+                return ready[0]
+
+            # Smooth weighted round-robin: even turns for equal scores
+            total = 0.0
+            for pooled in ready:
+                pooled._current_weight += pooled.score
+                total += pooled.score
+            chosen = max(ready, key=lambda s: s._current_weight)
+            chosen._current_weight -= total
+            return chosen
+
+    def record(
+        self,
+        pooled: PooledSession,
+        ok: bool,
+        latency: Optional[float] = None,
+        challenged: bool = False,
+    ) -> None:
+        """
+        Update a session's health after a request.
+
+        Args:
+            pooled: Session the request was sent with
+            ok: Whether the request succeeded
+            latency: Seconds the request took, if it got a response
+            challenged: Whether the site challenged or refused the session
+        """
+        with self._lock:
+            pooled.requests += 1
+            if latency is not None:
+                pooled.latency = (
+                    latency
+                    if pooled.latency is None
+                    else 0.8 * pooled.latency + 0.2 * latency
+                )
+
+            if ok:
+                pooled.health = 0.8 * pooled.health + 0.2
+            else:
+                if challenged:
+                    pooled.challenges += 1
+                    pooled.health *= 0.5
+                    if self.on_challenge:
+                        self.on_challenge(pooled)
+                else:
+                    pooled.errors += 1
+                    pooled.health *= 0.8
+                if challenged or pooled.health < self.MIN_HEALTH:
+                    cooldown = (
+                        self.CHALLENGE_COOLDOWN if challenged else self.ERROR_COOLDOWN
+                    )
+                    pooled.cooldown_until = time.monotonic() + cooldown
+                    if len(self.sessions) > 1:
+                        logger.warning(
+                            f"Resting session {pooled.name} for {cooldown}s "
+                            f"(health {pooled.health:.2f})"
+                        )
+            SESSION_HEALTH.set(pooled.health, session=pooled.name)
+
+    def reinstate(self, pooled: PooledSession) -> None:
+        """End a session's rest early, e.g. after its cookies were refreshed."""
+        with self._lock:
+            pooled.cooldown_until = 0.0
+            pooled.health = max(pooled.health, 0.5)
+            SESSION_HEALTH.set(pooled.health, session=pooled.name)
+
+    def close(self) -> None:
+        """Close every session."""
+        for pooled in self.sessions:
+            pooled.session.close()
+
+
+class CookieRefresher:
+    """
+    Refresh the checker's cookie sessions from a background thread.
+
+    Every session is refreshed on a fixed interval, and a challenged one
+    straight away. Each refresh runs on a copy of the session's cookie jar;
+    only a successful refresh swaps the new jar in, in a single assignment,
+    so requests in flight never see a half-updated jar and polling never
+    waits for a refresh.
+    """
+
+    def __init__(
+        self,
+        pool: SessionPool,
+        refresh_interval: float = 1800,
+        min_gap: float = 60,
+    ):
+        """
+        Initialize the refresher and hook it up to the pool's challenges.
+
+        Args:
+            pool: Sessions to keep fresh
+            refresh_interval: Seconds between routine refreshes of each session
+            min_gap: Fewest seconds between two refreshes of the same session
+        """
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+        self.min_gap = min_gap
+        self._refreshed_at: Dict[str, float] = {
+            pooled.name: time.monotonic() for pooled in pool.sessions
+        }
+        self._urgent: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        pool.on_challenge = self.request_refresh
+
+    def start(self) -> None:
+        """Start refreshing in the background."""
+        self._thread = threading.Thread(
+            target=self._run, name="cookie-refresher", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Refreshing cookies every {self.refresh_interval}s and on challenges"
+        )
+
+    def request_refresh(self, pooled: PooledSession) -> None:
+        """Ask for a session to be refreshed as soon as allowed."""
+        with self._lock:
+            self._urgent.add(pooled.name)
+        self._wake.set()
+
+    def _due(self) -> List[PooledSession]:
+        """Sessions to refresh now, and clear their urgent flags."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for pooled in self.pool.sessions:
+                since = now - self._refreshed_at[pooled.name]
+                if since < self.min_gap:
+                    continue
+                if pooled.name in self._urgent or since >= self.refresh_interval:
+                    self._urgent.discard(pooled.name)
+                    due.append(pooled)
+        return due
+
+    def refresh(self, pooled: PooledSession) -> bool:
+        """
+        Refresh one session's cookies and swap them in if it worked.
+
+        Returns:
+            Whether the refresh succeeded
+        """
+        from refresh_cookies import SessionRefresher
+
+        self._refreshed_at[pooled.name] = time.monotonic()
+        work = requests.Session()
+        work.cookies = pooled.session.cookies.copy()
+        try:
+            refreshed = SessionRefresher(
+                session=work, cookies_file=None
+            ).refresh_session()
+        finally:
+            work.close()
+
+        if refreshed:
+            # One reference assignment: the swap is atomic for other threads
+            pooled.session.cookies = work.cookies
+            self.pool.reinstate(pooled)
+            logger.info(f"Refreshed cookies for session {pooled.name}")
+        else:
+            logger.warning(
+                f"Could not refresh cookies for session {pooled.name}; "
+                f"it may need new cookies from a browser"
+            )
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for pooled in self._due():
+                if self._stop.is_set():
+                    return
+                self.refresh(pooled)
+
+            # Sleep until the next routine refresh or an urgent request
+            now = time.monotonic()
+            next_due = min(
+                self._refreshed_at[pooled.name] + self.refresh_interval
+                for pooled in self.pool.sessions
+            )
+            wait = max(next_due - now, 1.0)
+            with self._lock:
+                if self._urgent:
+                    # Held back by min_gap; check again once it has passed
+                    wait = min(wait, self.min_gap)
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def close(self, timeout: float = 5) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class PhantomRanchChecker:
+    """Class to check Phantom Ranch availability and send notifications."""
+
+    BASE_URL = "https://secure.phantomranchlottery.com/phantom-ranch-lottery/availability/calendar"
+
+    # Seconds without a request after which pooled connections are checked
+    # and any the server has closed are re-opened
+    WARM_AFTER_IDLE = 15
+    # Page next to the availability endpoint loaded to open a connection
+    WARM_PAGE = "check"
+
+    def __init__(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        check_interval: int = 3600,
+        nights: int = 2,
+        people_per_room: int = 4,
+        cookies: Optional[str] = None,
+        notification_manager: Optional["NotificationManager"] = None,
+        pool_size: int = 4,
+        base_url: Optional[str] = None,
+        concurrency: int = 1,
+        request_spacing: float = 2.0,
+        watches: Optional[List[Watch]] = None,
+        state_store: Optional[AvailabilityStore] = None,
+        event_log: Optional[EventLog] = None,
+        proximity_polling: bool = False,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        alert_debounce: float = 0.0,
+        tracer: Optional[Tracer] = None,
+        recorder: Optional[ResponseRecorder] = None,
+        derive_nights: bool = False,
+        send_alerts: bool = True,
+        cookie_sets: Optional[List[Tuple[str, str]]] = None,
+        cookie_refresh_interval: Optional[float] = None,
+        config_reloader: Optional["ConfigReloader"] = None,
+    ):
+        """
+        Initialize the checker with search parameters.
+
+        Args:
+            start_date: The earliest date to check
+            end_date: The latest date to check
+            check_interval: How often to check in seconds (default: 1 hour)
+            nights: Number of nights to stay (default: 2)
+            people_per_room: Number of people per room (default: 4)
+            cookies: Cookie string from a successful browser session
+            notification_manager: Optional NotificationManager for alerts
+            pool_size: Maximum number of keep-alive connections to hold open
+            base_url: Override the availability endpoint (e.g. a local stub)
+            concurrency: Maximum window requests in flight at once (default: 1)
+            request_spacing: Minimum seconds between request starts (default: 2)
+            watches: Watches to check; defaults to a single watch built from
+                start_date, end_date, nights and people_per_room
+            state_store: Optional AvailabilityStore to persist availability
+                across restarts
+            event_log: Optional EventLog to append every opening and closing to
+            proximity_polling: Poll near-term, frequently changing windows more
+                often and distant ones less, at the same total request rate
+            circuit_breaker: Backoff policy for failing requests (default:
+                a CircuitBreaker with default settings)
+            alert_debounce: Seconds to collect new dates into one alert
+                (default: 0, one alert per cycle)
+            tracer: Optional Tracer recording per-cycle pipeline timings
+            recorder: Optional ResponseRecorder capturing every response for replay
+            derive_nights: Poll each party size once as 1-night stays and work
+                out longer stays from runs of available nights
+            send_alerts: Alert on new dates; False for shard workers, whose
+                leader reads their discoveries from the state store instead
+            cookie_sets: (name, cookie string) pairs to spread requests
+                across; defaults to `cookies` alone
+            cookie_refresh_interval: Refresh every session's cookies in the
+                background this often, and immediately when one is
+                challenged (default: None, no refreshing)
+            config_reloader: Optional ConfigReloader checked between cycles
+                for new watches, interval and notification targets
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.check_interval = check_interval
+        self.nights = nights
+        self.people_per_room = people_per_room
+        self.cookies = cookies
+        self.notification_manager = notification_manager
+        # Never let concurrent requests queue up waiting for a pooled connection
+        self.pool_size = max(pool_size, concurrency)
+        self.base_url = base_url or self.BASE_URL
+        self.concurrency = max(1, concurrency)
+        self.request_spacing = request_spacing
+
+        # Request spacing is shared by all fetch threads
+        self._spacing_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._last_request_at = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.watches = watches or [
+            Watch(start_date, end_date, nights, people_per_room)
+        ]
+
+        # One planner per (nights, people) group, since the response span
+        # may differ between room configurations
+        self.planners: Dict[Tuple[int, int], CoveragePlanner] = {}
+
+        # Dates currently known to be available, per (nights, people) group,
+        # restored from the state store so a restart doesn't re-notify them
+        self.state_store = state_store
+        self.event_log = event_log
+        self.available_dates: Dict[Tuple[int, int], set] = (
+            state_store.load_available() if state_store else {}
+        )
+
+        # With derive_nights, 1-night availability per party size, and the
+        # stays last derived from it per (nights, people) group
+        self.derive_nights = derive_nights
+        self.calendars: Dict[int, AvailabilityCalendar] = {}
+        self._derived_stays: Dict[Tuple[int, int], object] = {}
+
+        # Skip parsing and diffing windows whose response body hasn't changed
+        self.response_cache = ResponseCache()
+        self.windows_changed = 0
+        self.windows_unchanged = 0
+
+        # Decides which windows are due each time round the loop
+        self.scheduler = PollScheduler(check_interval, proximity=proximity_polling)
+        self.breaker = circuit_breaker or CircuitBreaker()
+        self.alerts = AlertCoalescer(alert_debounce)
+        self.send_alerts = send_alerts
+        self.tracer = tracer
+        self.recorder = recorder
+        self.config_reloader = config_reloader
+
+        # Control API state: commands arrive on another thread and are
+        # applied by the loop; status is published for it to read
+        self.paused = False
+        self._check_requests: "queue.Queue[Tuple[datetime, int, int]]" = queue.Queue()
+        self._wake = threading.Event()
+        self.publish_status = False
+        self.status: Dict = {}
+        # (window, days it covers) as of the last refresh_status()
+        self._published_windows: List[Tuple[Tuple[datetime, int, int], int]] = []
+
+        # Track consecutive errors to avoid spam notifications
+        self.consecutive_errors = 0
+        self.max_consecutive_errors = 3  # Notify after this many errors in a row
+        self.error_notification_sent = False
+
+        # Default headers for the request - these are important for authentication
+        self.headers = {
+            "accept": "*/*",
+            "accept-language": "en-US,en;q=0.9",
+            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "origin": "https://secure.phantomranchlottery.com",
+            "referer": "https://secure.phantomranchlottery.com/phantom-ranch-lottery/availability/check",
+            "sec-ch-ua": '"Chromium";v="136", "Google Chrome";v="136", "Not.A/Brand";v="99"',
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Linux"',
+            "sec-fetch-dest": "empty",
+            "sec-fetch-mode": "cors",
+            "sec-fetch-site": "same-origin",
+            "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36",
+            "x-requested-with": "XMLHttpRequest",
+        }
+
+        # The traceparent and tracestate values can help with authentication
+        # In a real implementation you might need to update these
+        self.headers["traceparent"] = (
+            "00-471a9749bf000db57c8f4a6f0793de6a-d2f6eea960adb4be-01"
+        )
+        self.headers["tracestate"] = (
+            "657574@nr=0-1-657574-1134572858-d2f6eea960adb4be----1747836451074"
+        )
+        self.headers["newrelic"] = (
+            "eyJ2IjpbMCwxXSwiZCI6eyJ0eSI6IkJyb3dzZXIiLCJhYyI6IjY1NzU3NCIsImFwIjoiMTEzNDU3Mjg1OCIsImlkIjoiZDJmNmVlYTk2MGFkYjRiZSIsInRyIjoiNDcxYTk3NDliZjAwMGRiNTdjOGY0YTZmMDc5M2RlNmEiLCJ0aSI6MTc0NzgzNjQ1MTA3NH19"
+        )
+        self.headers["x-newrelic-id"] = "UgMAVFFXGwIAV1VXBQEBX1U="
+
+        # One long-lived session per cookie set so every window reuses the
+        # same keep-alive connections instead of paying for a new TCP+TLS
+        # handshake
+        self._room_configs: Dict[Tuple[int, int], str] = {}
+        self.sessions = SessionPool(
+            [
+                PooledSession(
+                    name,
+                    self._create_session(cookie_string),
+                    RequestPlan(self._build_payload),
+                )
+                for name, cookie_string in (cookie_sets or [("default", cookies)])
+            ]
+        )
+        # The first session, for callers that only need one
+        self.session = self.sessions.sessions[0].session
+
+        self.cookie_refresher: Optional[CookieRefresher] = None
+        if cookie_refresh_interval:
+            self.cookie_refresher = CookieRefresher(
+                self.sessions, cookie_refresh_interval
+            )
+            self.cookie_refresher.start()
+
+    def _create_session(self, cookies: Optional[str] = None) -> requests.Session:
+        """Create the pooled HTTP session used for all availability requests."""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+
+        # Parse the cookie string once rather than on every request
+        session.cookies.update(self._parse_cookie_string(cookies))
+        return session
+
+    def _warm_connection(self, pooled: PooledSession) -> None:
+        """Open one of a session's connections by loading the search page."""
+        self._wait_for_request_slot()
+        try:
+            # The availability endpoint only takes POSTs; the search page
+            # next to it is a plain GET (refresh_cookies visits it too)
+            pooled.session.get(
+                urljoin(self.base_url, self.WARM_PAGE),
+                timeout=10,
+                allow_redirects=False,
+            )
+        except requests.exceptions.RequestException as e:
+            # Not fatal - the first real request will connect on its own
+            logger.warning(f"Could not warm connection for session {pooled.name}: {e}")
+
+    def _open_connections(self, pooled: PooledSession) -> int:
+        """Count a session's pooled connections to the server that are still open."""
+        adapter = pooled.session.get_adapter(self.base_url)
+        if not isinstance(adapter, requests.adapters.HTTPAdapter):
+            return 0  # Replayed responses; there is no connection pool
+        host = urlparse(self.base_url).hostname
+        open_connections = 0
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None or pool.host != host:
+                continue
+            # urllib3 keeps idle connections in a queue with None for empty
+            # slots; if that ever changes, everything counts as closed and is
+            # simply warmed again
+            idle = getattr(getattr(pool, "pool", None), "queue", ())
+            for conn in list(idle):
+                if conn is not None and not is_connection_dropped(conn):
+                    open_connections += 1
+        return open_connections
+
+    def warm_connections(self) -> None:
+        """
+        Open the connections a check cycle will use, ahead of time.
+
+        Only sessions with no open connection are warmed: on the first cycle,
+        or once the server has closed the idle ones. Warm-up requests keep
+        to request_spacing like any other, so with spacing they share one
+        connection, just as the cycle's requests will.
+        """
+        # Connections used in the last few seconds are still open, and a
+        # failing server shouldn't get extra traffic while backing off
+        if time.monotonic() - self._last_request_at < self.WARM_AFTER_IDLE:
+            return
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return
+
+        # Requests are spread over the sessions, so each needs its share open
+        sessions = self.sessions.sessions
+        per_session = -(-self.concurrency // len(sessions))
+        cold = []
+        for pooled in sessions:
+            if not self._open_connections(pooled):
+                cold.extend([pooled] * per_session)
+        if not cold:
+            return
+        if len(cold) == 1:
+            self._warm_connection(cold[0])
+            return
+
+        executor = self._get_executor()
+        futures = [executor.submit(self._warm_connection, pooled) for pooled in cold]
+        for future in futures:
+            future.result()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the thread pool used for concurrent window requests."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="window-fetch"
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """Close the HTTP session and release its pooled connections."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.cookie_refresher:
+            self.cookie_refresher.close()
+        self.sessions.close()
+        if self.state_store:
+            self.state_store.close()
+        if self.event_log:
+            self.event_log.close()
+        # A notification manager's queued sends still trace; its owner closes
+        # the tracer once they have drained
+        if self.tracer and not self.notification_manager:
+            self.tracer.close()
+        if self.recorder:
+            self.recorder.close()
+
+    def _wait_for_request_slot(self) -> None:
+        """Block until request_spacing has passed since the last request start."""
+        with self._spacing_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + self.request_spacing
+
+        if slot > now:
+            time.sleep(slot - now)
+        self._last_request_at = time.monotonic()
+
+    def _watch_groups(self) -> Dict[Tuple[int, int], List[Watch]]:
+        """Group watches by (nights, people) so they share requests."""
+        groups: Dict[Tuple[int, int], List[Watch]] = {}
+        for watch in self.watches:
+            groups.setdefault(watch.group, []).append(watch)
+        return groups
+
+    def _poll_groups(self) -> Dict[Tuple[int, int], List[Watch]]:
+        """
+        Group watches by the (nights, people) requests that serve them.
+
+        With derive_nights every party size is polled once as 1-night stays;
+        otherwise this is the same as _watch_groups().
+        """
+        groups = self._watch_groups()
+        if not self.derive_nights:
+            return groups
+        polled: Dict[Tuple[int, int], List[Watch]] = {}
+        for (nights, people), watches in groups.items():
+            polled.setdefault((1, people), []).extend(watches)
+        return polled
+
+    def _calendar_for(self, people: int) -> AvailabilityCalendar:
+        """Return the 1-night calendar for a party size."""
+        if people not in self.calendars:
+            origin = min(
+                watch.start_date
+                for watch in self.watches
+                if watch.people_per_room == people
+            )
+            self.calendars[people] = AvailabilityCalendar(origin.date())
+        return self.calendars[people]
+
+    def _derive_changes(self, nights: int, people: int) -> Dict[str, bool]:
+        """
+        Stays of `nights` nights that opened or closed since last derived.
+
+        Args:
+            nights: Stay length to derive
+            people: Party size
+
+        Returns:
+            Changed stay start dates mapped to their new availability
+        """
+        calendar = self._calendar_for(people)
+        stays = calendar.stays(nights)
+        previous = self._derived_stays.get((nights, people))
+        if previous is None:
+            # First derivation since a restart or reload: diff against the
+            # stays already known (e.g. restored from the state DB), so any
+            # that have closed since are forgotten and re-alerted on reopening
+            previous = [False] * len(stays)
+            for date_str in self.available_dates.get((nights, people), ()):
+                day = parse_result_date(date_str)
+                if day is not None and 0 <= (day - calendar.origin).days < len(stays):
+                    previous[(day - calendar.origin).days] = True
+        opened, closed = AvailabilityCalendar.diff(previous, stays)
+        self._derived_stays[(nights, people)] = stays
+
+        changes = {calendar.date_at(offset): True for offset in opened}
+        changes.update({calendar.date_at(offset): False for offset in closed})
+        return changes
+
+    def _group_ranges(self, watches: List[Watch]) -> List[Tuple[datetime, datetime]]:
+        """Merge the date ranges of a group's watches into disjoint ranges."""
+        ranges: List[Tuple[datetime, datetime]] = []
+        for watch in sorted(watches, key=lambda w: w.start_date):
+            if ranges and watch.start_date <= ranges[-1][1] + timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], watch.end_date))
+            else:
+                ranges.append((watch.start_date, watch.end_date))
+        return ranges
+
+    def _planner_for(self, group: Tuple[int, int]) -> CoveragePlanner:
+        """Return the coverage planner for a (nights, people) group."""
+        if group not in self.planners:
+            self.planners[group] = CoveragePlanner()
+        return self.planners[group]
+
+    def _window_requests(self) -> List[Tuple[datetime, int, int]]:
+        """
+        Return every (start date, nights, people) request for a cycle.
+
+        Watches sharing a (nights, people) group are planned over their merged
+        date range, so identical requests are only made once.
+        """
+        window_requests = set()
+        for group, watches in self._poll_groups().items():
+            planner = self._planner_for(group)
+            for start_date, end_date in self._group_ranges(watches):
+                for check_date in planner.plan(start_date, end_date):
+                    window_requests.add((check_date, *group))
+        return sorted(window_requests)
+
+    def _shrunk_groups(self) -> set:
+        """Groups whose response span shrank, leaving gaps until re-polled."""
+        return {
+            group
+            for group, planner in self.planners.items()
+            if planner.take_span_shrank()
+        }
+
+    def _requests_saved(self) -> int:
+        """Requests per cycle saved by the planners vs. a fixed 30-day stride."""
+        saved = 0
+        for group, watches in self._poll_groups().items():
+            planner = self._planner_for(group)
+            for start_date, end_date in self._group_ranges(watches):
+                saved += planner.requests_saved(start_date, end_date)
+        return saved
+
+    def _fetch_window(self, window_request: Tuple[datetime, int, int]) -> Dict:
+        """Fetch one window, respecting request spacing and the circuit breaker."""
+        if not self.breaker.try_acquire():
+            # Left due, so it is fetched once the breaker allows requests again
+            return {"success": False, "error": "Backing off", "skipped": True}
+
+        self._wait_for_request_slot()
+        response = self.check_availability(*window_request)
+        if response.get("success", False):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(response.get("retry_after"))
+        return response
+
+    def fetch_windows(
+        self, window_requests: List[Tuple[datetime, int, int]]
+    ) -> List[Tuple[Tuple[datetime, int, int], Dict]]:
+        """
+        Fetch every window, in parallel when concurrency allows.
+
+        Args:
+            window_requests: (start date, nights, people) requests to make
+
+        Returns:
+            List of (request, API response) pairs in request order
+        """
+        for pooled in self.sessions.sessions:
+            pooled.plan.compile(pooled.session, self.base_url, window_requests)
+
+        if self.concurrency <= 1 or len(window_requests) <= 1:
+            responses = [self._fetch_window(request) for request in window_requests]
+        else:
+            # map() yields results in submission order, so the merge stays sorted
+            responses = list(
+                self._get_executor().map(self._fetch_window, window_requests)
+            )
+
+        return list(zip(window_requests, responses))
+
+    def _format_date(self, date: datetime) -> str:
+        """Format a date for the API request."""
+        return date.strftime("%m/%d/%Y")
+
+    def _build_payload(
+        self,
+        check_date: datetime,
+        nights: Optional[int] = None,
+        people_per_room: Optional[int] = None,
+    ) -> str:
+        """Build the request payload for the given date."""
+        formatted_date = self._format_date(check_date)
+        nights = nights or self.nights
+        people_per_room = people_per_room or self.people_per_room
+
+        # Build room configuration - this matches the payload pattern in the example
+        # H4[] is empty, then H4[1][] has 3 values, then H4[2][] has 3 values for each night
+        room_config = self._room_configs.get((nights, people_per_room))
+        if room_config is None:
+            room_config = "&H4%5B%5D=" + "".join(
+                f"&H4%5B{night}%5D%5B%5D={people_per_room}"
+                f"&H4%5B{night}%5D%5B%5D=0"
+                f"&H4%5B{night}%5D%5B%5D=0"
+                for night in range(1, nights + 1)
+            )
+            self._room_configs[(nights, people_per_room)] = room_config
+
+        return f"date={formatted_date}&nights={nights}{room_config}"
+
+    def check_availability(
+        self,
+        check_date: datetime,
+        nights: Optional[int] = None,
+        people_per_room: Optional[int] = None,
+    ) -> Dict:
+        """
+        Check availability starting from the given date.
+
+        Args:
+            check_date: The date to check availability from
+            nights: Number of nights to stay (default: the checker's nights)
+            people_per_room: People per room (default: the checker's people)
+
+        Returns:
+            Dict containing the API response
+        """
+        nights = nights or self.nights
+        people = people_per_room or self.people_per_room
+        pooled = self.sessions.acquire()
+        prepared, send_kwargs = pooled.plan.get(
+            pooled.session, self.base_url, (check_date, nights, people)
+        )
+        payload = prepared.body
+
+        try:
+            logger.info(
+                f"Checking availability for {self._format_date(check_date)} ({nights} nights)",
+                extra=CHATTY,
+            )
+
+            window = self._format_date(check_date)
+            if self.tracer:
+                self.tracer.mark("request_sent", w=window, n=nights, p=people)
+            started = time.perf_counter()
+            response = pooled.session.send(prepared, timeout=30, **send_kwargs)
+            latency = time.perf_counter() - started
+            REQUEST_SECONDS.observe(latency)
+            REQUESTS.inc(status=response.status_code)
+            if self.tracer:
+                self.tracer.mark("response_received", w=window, n=nights, p=people)
+            if self.recorder:
+                self.recorder.record(
+                    (window, nights, people),
+                    payload,
+                    response.status_code,
+                    {
+                        name: response.headers[name]
+                        for name in ("Content-Type", "Retry-After")
+                        if name in response.headers
+                    },
+                    response.text,
                 )
 
             if response.status_code == 200:
-                return response.json()
+                # Unchanged body: reuse the parsed response instead of decoding again
+                key = (check_date, nights, people)
+                digest = self.response_cache.fingerprint(response.content)
+                cached = self.response_cache.lookup(key, digest)
+                if cached is not None:
+                    self.sessions.record(pooled, True, latency)
+                    return cached
+
+                result = response.json()
+                if self.tracer:
+                    self.tracer.mark("json_parsed", w=window, n=nights, p=people)
+                self.sessions.record(pooled, result.get("success", False), latency)
+                if result.get("success", False):
+                    self.response_cache.store(key, digest, result)
+                return result
             else:
+                self.sessions.record(
+                    pooled,
+                    False,
+                    latency,
+                    challenged=response.status_code in SessionPool.CHALLENGE_STATUSES,
+                )
                 error_msg = f"Error: Received status code {response.status_code}"
                 logger.error(error_msg)
                 logger.error(
@@ -390,11 +3143,33 @@ class PhantomRanchChecker:
                 if self.notification_manager:
                     error_title = "Phantom Ranch Checker Error"
                     error_message = f"Failed to check availability: {error_msg}. The script may need attention."
-                    self.notification_manager.notify_all(error_title, error_message)
+                    self.notification_manager.submit(
+                        error_title,
+                        error_message,
+                        priority=NotificationManager.PRIORITY_ERROR,
+                    )
 
-                return {"success": False, "error": f"HTTP {response.status_code}"}
+                return {
+                    "success": False,
+                    "error": f"HTTP {response.status_code}",
+                    "retry_after": parse_retry_after(
+                        response.headers.get("Retry-After")
+                    ),
+                }
 
         except requests.exceptions.RequestException as e:
+            # An HTML page instead of JSON is usually a bot check or login page
+            bad_body = isinstance(e, requests.exceptions.JSONDecodeError)
+            self.sessions.record(pooled, False, challenged=bad_body)
+            # A bad body was already counted and recorded under its status
+            if not bad_body:
+                REQUESTS.inc(status="exception")
+                if self.recorder:
+                    self.recorder.record(
+                        (window, nights, people),
+                        payload,
+                        error=str(e),
+                    )
             error_msg = f"Request failed: {e}"
             logger.error(error_msg)
 
@@ -402,7 +3177,11 @@ class PhantomRanchChecker:
             if self.notification_manager:
                 error_title = "Phantom Ranch Checker Error"
                 error_message = f"Failed to check availability: {error_msg}. The script may need attention."
-                self.notification_manager.notify_all(error_title, error_message)
+                self.notification_manager.submit(
+                    error_title,
+                    error_message,
+                    priority=NotificationManager.PRIORITY_ERROR,
+                )
 
             return {"success": False, "error": str(e)}
 
@@ -419,150 +3198,646 @@ class PhantomRanchChecker:
                 name, value = part.strip().split("=", 1)
                 cookies[name] = value
 
-        return cookies
+        return cookies
+
+    def parse_available_dates(self, response: Dict) -> List[str]:
+        """
+        Parse the response to find available dates.
+
+        Args:
+            response: API response dictionary
+
+        Returns:
+            List of available dates as strings
+        """
+        available_dates = []
+
+        if not response.get("success", False):
+            logger.warning(
+                f"Unsuccessful API response: {response.get('msg', 'Unknown error')}"
+            )
+            return available_dates
+
+        results = response.get("results", {})
+        for date_str, available in results.items():
+            if available:
+                available_dates.append(date_str)
+
+        return available_dates
+
+    def notify_available_dates(
+        self,
+        new_available_dates: List[str],
+        nights: Optional[int] = None,
+        people_per_room: Optional[int] = None,
+    ) -> None:
+        """
+        Notify about newly available dates.
+
+        Args:
+            new_available_dates: List of newly available dates
+            nights: Stay length the dates are for (default: the checker's nights)
+            people_per_room: Party size the dates are for (default: the checker's)
+        """
+        nights = nights or self.nights
+        people_per_room = people_per_room or self.people_per_room
+        self.notify_discoveries({(nights, people_per_room): new_available_dates})
+
+    def notify_discoveries(
+        self,
+        discoveries: Dict[Tuple[int, int], List[str]],
+        trace_id: Optional[int] = None,
+    ) -> None:
+        """
+        Send one combined notification for newly available dates.
+
+        Args:
+            discoveries: Newly available dates per (nights, people) group
+            trace_id: Trace of the cycle the dates were found in
+        """
+        discoveries = {group: dates for group, dates in discoveries.items() if dates}
+        if not discoveries or not self.send_alerts:
+            return
+
+        if self.tracer:
+            self.tracer.mark("notify_entered", trace_id)
+
+        total = sum(len(dates) for dates in discoveries.values())
+
+        # Print to console with emphasis
+        print("\n" + "=" * 50)
+        print(f"AVAILABILITY FOUND! {total} dates available:")
+        for (nights, people_per_room), new_available_dates in discoveries.items():
+            for date_str in new_available_dates:
+                print(f"  ✓ {date_str} - {nights} night(s), {people_per_room} people")
+        print("=" * 50 + "\n")
+
+        # Log the findings
+        for (nights, people_per_room), new_available_dates in discoveries.items():
+            logger.info(
+                f"Found {len(new_available_dates)} available dates ({nights} nights, {people_per_room} people): {', '.join(new_available_dates)}"
+            )
+
+        # Send notifications if a notification manager is available
+        if self.notification_manager:
+            title = f"Phantom Ranch: {total} Dates Available!"
+
+            # Prepare message for notifications
+            sections = []
+            for (nights, people_per_room), new_available_dates in discoveries.items():
+                section = f"Found {len(new_available_dates)} available dates for {nights} night stays ({people_per_room} people per room):\n\n"
+                section += "\n".join([f"• {date_str}" for date_str in new_available_dates])
+                sections.append(section)
+            message = "\n\n".join(sections)
+            if self.event_log:
+                message += (
+                    f"\n\nEvery opening and closing is logged in "
+                    f"{self.event_log.event_file} (see query_events.py)."
+                )
+
+            # Short message for SMS
+            (nights, _), first_dates = next(iter(discoveries.items()))
+            sms_message = f"Phantom Ranch: Found {total} available dates including {first_dates[0]} ({nights}n)"
+
+            # Send all configured notifications
+            self.notification_manager.submit(
+                title,
+                message,
+                sms_message,
+                priority=NotificationManager.PRIORITY_AVAILABILITY,
+                trace_id=trace_id,
+            )
+
+    def notify_errors(
+        self, consecutive: int, error: str, source: Optional[str] = None
+    ) -> None:
+        """
+        Send the error notification for a run of consecutive errors.
+
+        Args:
+            consecutive: Consecutive errors so far
+            error: Last error message
+            source: Shard worker that hit them, if not this process
+        """
+        if not self.notification_manager:
+            return
+        where = f" in {source}" if source else ""
+        error_title = "Phantom Ranch Checker - Multiple Errors"
+        error_message = (
+            f"The script has encountered {consecutive} consecutive errors{where}. "
+            f"Last error: {error}. "
+            f"Please check the logs and verify your authentication."
+        )
+        sms_message = f"Phantom Ranch Checker Error: Multiple failures. Please check script."
+        self.notification_manager.submit(
+            error_title,
+            error_message,
+            sms_message,
+            priority=NotificationManager.PRIORITY_ERROR,
+        )
+
+    def flush_alerts(self, force: bool = False) -> None:
+        """Send the coalesced alert if its debounce window has passed."""
+        if force or self.alerts.due():
+            trace_id = self.alerts.trace_id
+            discoveries = self.alerts.take()
+            self.notify_discoveries(discoveries, trace_id)
+            if self.state_store and self.send_alerts:
+                # Only now are the dates known for good, so one found but
+                # killed before its alert went out is alerted after a restart
+                for (nights, people), dates in discoveries.items():
+                    still_open = self.available_dates.get((nights, people), set())
+                    for date in dates:
+                        if date in still_open:
+                            self.state_store.record(date, nights, people, True)
+                self.state_store.flush()
+
+    def _apply_changes(
+        self,
+        changed_results: Dict,
+        nights: int,
+        people: int,
+        watches: List[Watch],
+    ) -> List[str]:
+        """
+        Update known availability from a window's changed dates.
+
+        Args:
+            changed_results: Dates whose availability changed in the window
+            nights: Stay length of the window
+            people: Party size of the window
+            watches: Watches in the window's (nights, people) group
+
+        Returns:
+            Dates that have newly become available
+        """
+        known_dates = self.available_dates.setdefault((nights, people), set())
+
+        # Only the changed dates inside one of the group's watch ranges
+        available_dates = [
+            date
+            for date in self.parse_available_dates(
+                {"success": True, "results": changed_results}
+            )
+            if any(watch.covers(date) for watch in watches)
+        ]
+
+        # Find dates that weren't already known to be available
+        new_available_dates = [
+            date for date in available_dates if date not in known_dates
+        ]
+        known_dates.update(new_available_dates)
+
+        # Forget dates that have closed again so a reopening is re-alerted
+        closed_dates = [
+            date
+            for date, available in changed_results.items()
+            if not available and date in known_dates
+        ]
+        known_dates.difference_update(closed_dates)
+        if closed_dates:
+            logger.info(f"No longer available: {', '.join(closed_dates)}")
+
+        if self.state_store:
+            # Alerting checkers record new dates once the alert is handed
+            # over (see flush_alerts); shard workers' leader alerts from these
+            if not self.send_alerts:
+                for date in new_available_dates:
+                    self.state_store.record(date, nights, people, True)
+            for date in closed_dates:
+                self.state_store.record(date, nights, people, False)
+        if self.event_log:
+            for date in new_available_dates:
+                self.event_log.record(date, nights, people, True)
+            for date in closed_dates:
+                self.event_log.record(date, nights, people, False)
+
+        return new_available_dates
+
+    def run_cycle(self, window_requests: List[Tuple[datetime, int, int]]) -> None:
+        """
+        Poll the given windows once, then diff and notify their results.
+
+        Args:
+            window_requests: (start date, nights, people) windows to poll
+        """
+        cycle_started = time.perf_counter()
+        any_available = False
+        cycle_has_error = False
+        if self.tracer:
+            self.tracer.start_cycle()
+        if self.recorder:
+            self.recorder.start_cycle()
+
+        self.warm_connections()
+        groups = self._poll_groups()
+        derived_people = set()
+
+        windows = [
+            (window_request, response)
+            for window_request, response in self.fetch_windows(window_requests)
+            if not response.get("skipped")
+        ]
+        # Work out which windows actually changed since last time
+        changes = {}
+        for window_request, response in windows:
+            if response.get("success", False):
+                changes[window_request] = self.response_cache.take_changes(
+                    window_request
+                )
+                check_date, *group = window_request
+                self._planner_for(tuple(group)).observe(
+                    check_date,
+                    response,
+                    unchanged=changes[window_request] is None,
+                )
+
+        self.windows_changed = 0
+        self.windows_unchanged = 0
+        for window_request, response in windows:
+            check_date, nights, people = window_request
+            changed_results = changes.get(window_request)
+
+            if response.get("success", False):
+                # Failed windows stay due and are retried as the backoff allows
+                self.scheduler.record(window_request, changed=bool(changed_results))
+
+                # Reset error counter on success
+                self.consecutive_errors = 0
+                self.error_notification_sent = False
+
+                # Fast path: nothing to parse or diff for an unchanged window
+                if changed_results is None:
+                    self.windows_unchanged += 1
+                    WINDOWS_POLLED.inc(changed="false")
+                    continue
+                self.windows_changed += 1
+                WINDOWS_POLLED.inc(changed="true")
+
+                if (nights, people) not in groups:
+                    # The watch was removed while the request was in flight
+                    continue
+                if self.derive_nights:
+                    # Stays are derived once the whole cycle is in
+                    self._calendar_for(people).update(changed_results)
+                    derived_people.add(people)
+                    continue
+                new_available_dates = self._apply_changes(
+                    changed_results, nights, people, groups[(nights, people)]
+                )
+                if new_available_dates:
+                    any_available = True
+                    self.alerts.add(
+                        new_available_dates,
+                        nights,
+                        people,
+                        self.tracer.current if self.tracer else None,
+                    )
+            else:
+                # Track errors
+                cycle_has_error = True
+                self.consecutive_errors += 1
+
+                # Only notify on first occurrence or after threshold
+                if (
+                    self.consecutive_errors >= self.max_consecutive_errors
+                    and not self.error_notification_sent
+                ):
+                    error = response.get("error", "Unknown error")
+                    if self.notification_manager:
+                        self.notify_errors(self.consecutive_errors, error)
+                        self.error_notification_sent = True
+                    elif self.state_store and not self.send_alerts:
+                        # A shard worker has no notifier; its leader sends this
+                        import multiprocessing
+
+                        self.state_store.record_error(
+                            multiprocessing.current_process().name,
+                            self.consecutive_errors,
+                            error,
+                        )
+                        self.error_notification_sent = True
+
+        for (nights, people), watches in self._watch_groups().items():
+            if people not in derived_people:
+                continue
+            new_available_dates = self._apply_changes(
+                self._derive_changes(nights, people), nights, people, watches
+            )
+            if new_available_dates:
+                any_available = True
+                self.alerts.add(
+                    new_available_dates,
+                    nights,
+                    people,
+                    self.tracer.current if self.tracer else None,
+                )
+
+        if self.tracer:
+            self.tracer.mark("diff_computed")
+
+        # One write per cycle keeps the disk I/O cheap
+        if self.state_store:
+            self.state_store.flush()
+        if self.event_log:
+            self.event_log.flush()
+
+        # One alert for everything found this cycle (or debounce window)
+        self.flush_alerts()
+
+        CYCLE_SECONDS.observe(time.perf_counter() - cycle_started)
+        if self.tracer:
+            self.tracer.flush()
+        if self.recorder:
+            self.recorder.flush()
+        CIRCUIT_OPEN.set(0 if self.breaker.state == CircuitBreaker.CLOSED else 1)
+
+        saved = self._requests_saved()
+        logger.info(
+            f"Cycle used {len(windows)} requests; planner saves {saved} "
+            f"per cycle vs. a fixed 30-day stride",
+            extra=CHATTY,
+        )
+        logger.info(
+            f"Windows changed: {self.windows_changed}, "
+            f"unchanged: {self.windows_unchanged}",
+            extra=CHATTY,
+        )
+        if not any_available and not cycle_has_error:
+            logger.info("No availability found in this check cycle", extra=CHATTY)
+
+    def apply_config(
+        self, watches: List[Watch], check_interval: Optional[float] = None
+    ) -> None:
+        """
+        Switch to new watches (and interval) without restarting.
+
+        Connections, known availability and unchanged windows' schedules
+        are kept. Windows of groups whose watches changed are re-processed
+        in full and polled straight away.
+
+        Args:
+            watches: The new watches
+            check_interval: The new check interval in seconds, if it changed
+        """
+        def watch_keys(watch_list):
+            return {
+                (w.start_date, w.end_date, w.nights, w.people_per_room)
+                for w in watch_list
+            }
+
+        changed = watch_keys(self.watches) ^ watch_keys(watches)
+        self.watches = watches
+        if check_interval and check_interval != self.check_interval:
+            logger.info(f"Check interval changed to {check_interval} seconds")
+            self.check_interval = check_interval
+            self.scheduler.check_interval = check_interval
+            self.scheduler.reschedule()
+
+        changed_groups = {(nights, people) for _, _, nights, people in changed}
+        if self.derive_nights:
+            # Derived stays for a party size come from one shared calendar
+            changed_people = {people for _, people in changed_groups}
+            changed_groups = {(1, people) for people in changed_people}
+            for people in changed_people:
+                self.calendars.pop(people, None)
+            for group in [g for g in self._derived_stays if g[1] in changed_people]:
+                del self._derived_stays[group]
+        if not changed_groups:
+            logger.info("Configuration reloaded; watches unchanged")
+            return
+
+        # Dates newly inside a watch range are only seen on a full re-parse
+        self.response_cache.forget(changed_groups)
+        window_requests = self._window_requests()
+        self.scheduler.update_windows(window_requests)
+        self.scheduler.poll_now(
+            [request for request in window_requests if request[1:] in changed_groups]
+        )
+        for watch in watches:
+            logger.info(
+                f"Watching {watch.name} from {self._format_date(watch.start_date)} "
+                f"to {self._format_date(watch.end_date)}"
+            )
+        logger.info(
+            f"Configuration reloaded; re-polling {len(changed_groups)} changed group(s)"
+        )
 
-    def parse_available_dates(self, response: Dict) -> List[str]:
+    def request_check(
+        self,
+        check_date: Optional[date] = None,
+        nights: Optional[int] = None,
+        people: Optional[int] = None,
+    ) -> List[Tuple[datetime, int, int]]:
         """
-        Parse the response to find available dates.
+        Poll the matching windows as soon as possible, even while paused.
+
+        Safe to call from another thread: windows are matched against those
+        published by refresh_status(), not the live schedule.
 
         Args:
-            response: API response dictionary
+            check_date: Only the windows covering this date (default: all)
+            nights: Only windows for this many nights
+            people: Only windows for this many people
 
         Returns:
-            List of available dates as strings
+            The windows queued
         """
-        available_dates = []
+        if nights is not None and not isinstance(nights, int):
+            raise TypeError("nights must be an integer")
+        if people is not None and not isinstance(people, int):
+            raise TypeError("people must be an integer")
+
+        windows = []
+        for window, span in self._published_windows:
+            window_date, window_nights, window_people = window
+            # Derived stays are all served by the 1-night windows
+            if nights is not None and not self.derive_nights and window_nights != nights:
+                continue
+            if people is not None and window_people != people:
+                continue
+            if check_date is not None:
+                offset = (check_date - window_date.date()).days
+                if not 0 <= offset < span:
+                    continue
+            windows.append(window)
+
+        for window in windows:
+            self._check_requests.put(window)
+        if windows:
+            logger.info(f"Check requested for {len(windows)} window(s)")
+            self.wake()
+        return windows
+
+    def pause(self) -> None:
+        """Stop scheduled polling until resume(); requested checks still run."""
+        if not self.paused:
+            logger.info("Polling paused")
+        self.paused = True
+        self.wake()
+
+    def resume(self) -> None:
+        """Resume scheduled polling."""
+        if self.paused:
+            logger.info("Polling resumed")
+        self.paused = False
+        self.wake()
+
+    def wake(self) -> None:
+        """Cut the loop's current wait short."""
+        if self.config_reloader:
+            self.config_reloader.interrupt()
+        else:
+            self._wake.set()
 
-        if not response.get("success", False):
-            logger.warning(
-                f"Unsuccessful API response: {response.get('msg', 'Unknown error')}"
-            )
-            return available_dates
+    def _take_check_requests(self) -> List[Tuple[datetime, int, int]]:
+        """Return and clear the windows queued by request_check()."""
+        windows = set()
+        while True:
+            try:
+                windows.add(self._check_requests.get_nowait())
+            except queue.Empty:
+                return sorted(windows)
 
-        results = response.get("results", {})
-        for date_str, available in results.items():
-            if available:
-                available_dates.append(date_str)
+    def refresh_status(self) -> None:
+        """
+        Publish a snapshot of what the checker knows for the control API.
 
-        return available_dates
+        Runs on the loop's thread; the snapshot is replaced in one
+        assignment, so readers on other threads always see a whole one.
+        """
+        def when(timestamp):
+            if timestamp is None:
+                return None
+            return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+        now = time.monotonic()
+        windows = self.scheduler.windows()
+        spans = {}
+        for group in {window[1:] for window in windows}:
+            planner = self._planner_for(group)
+            spans[group] = planner.span_days or planner.default_span_days
+        self._published_windows = [(window, spans[window[1:]]) for window in windows]
+        self.status = {
+            "updated": when(time.time()),
+            "available": [
+                {"nights": nights, "people": people, "dates": sorted(dates)}
+                for (nights, people), dates in sorted(self.available_dates.items())
+            ],
+            "windows": [
+                {
+                    "date": window[0].strftime("%Y-%m-%d"),
+                    "nights": window[1],
+                    "people": window[2],
+                    "last_checked": when(self.scheduler.last_polled.get(window)),
+                    "next_due": when(self.scheduler.next_due(window)),
+                }
+                for window in windows
+            ],
+            "sessions": [
+                {
+                    "name": pooled.name,
+                    "health": round(pooled.health, 3),
+                    "latency": (
+                        round(pooled.latency, 3) if pooled.latency is not None else None
+                    ),
+                    "resting": now < pooled.cooldown_until,
+                    "requests": pooled.requests,
+                    "errors": pooled.errors,
+                    "challenges": pooled.challenges,
+                }
+                for pooled in self.sessions.sessions
+            ],
+        }
 
-    def notify_available_dates(self, new_available_dates: List[str]) -> None:
+    def replay(self, recording_file: str) -> int:
         """
-        Notify about newly available dates.
+        Re-run recorded check cycles through the parse, diff and notify path.
+
+        Requests are answered from the recording instead of the network, with
+        no spacing or backoff between them, so the replay runs at full speed.
 
         Args:
-            new_available_dates: List of newly available dates
+            recording_file: Recording written with a ResponseRecorder
+
+        Returns:
+            Number of recorded responses replayed
         """
-        if not new_available_dates:
-            return
+        records = load_recording(recording_file)
+        adapter = ReplayAdapter(records)
+        for pooled in self.sessions.sessions:
+            pooled.session.mount("https://", adapter)
+            pooled.session.mount("http://", adapter)
+        self.request_spacing = 0
+        # Recorded errors must not open the breaker and skip later windows
+        self.breaker = CircuitBreaker(failure_threshold=len(records) + 1)
+
+        cycles: Dict[int, List[Tuple[datetime, int, int]]] = {}
+        for record in records:
+            check_date, nights, people = record["w"]
+            cycles.setdefault(record["c"], []).append(
+                (parse_date(check_date), nights, people)
+            )
 
-        # Print to console with emphasis
-        print("\n" + "=" * 50)
-        print(f"AVAILABILITY FOUND! {len(new_available_dates)} dates available:")
-        for date_str in new_available_dates:
-            print(f"  ✓ {date_str} - {self.nights} night(s)")
-        print("=" * 50 + "\n")
+        started = time.perf_counter()
+        try:
+            for window_requests in cycles.values():
+                self.run_cycle(window_requests)
+        finally:
+            self.flush_alerts(force=True)
+            self.close()
 
-        # Log the findings
+        elapsed = time.perf_counter() - started
         logger.info(
-            f"Found {len(new_available_dates)} available dates: {', '.join(new_available_dates)}"
+            f"Replayed {len(records)} responses in {len(cycles)} cycles "
+            f"in {elapsed:.2f}s"
         )
-
-        # Save to a results file
-        with open("phantom_ranch_available_dates.txt", "a") as f:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"\n=== AVAILABILITY FOUND AT {timestamp} ===\n")
-            for date_str in new_available_dates:
-                f.write(f"{date_str} - {self.nights} night(s)\n")
-
-        # Send notifications if a notification manager is available
-        if self.notification_manager:
-            title = f"Phantom Ranch: {len(new_available_dates)} Dates Available!"
-
-            # Prepare message for notifications
-            message = f"Found {len(new_available_dates)} available dates for {self.nights} night stays:\n\n"
-            message += "\n".join([f"• {date_str}" for date_str in new_available_dates])
-            message += "\n\nCheck phantom_ranch_available_dates.txt for details."
-
-            # Short message for SMS
-            sms_message = f"Phantom Ranch: Found {len(new_available_dates)} available dates including {new_available_dates[0]}"
-
-            # Send all configured notifications
-            self.notification_manager.notify_all(title, message, sms_message)
+        return len(records)
 
     def run_continuously(self) -> None:
         """Run the checker continuously according to the check interval."""
-        logger.info(
-            f"Starting continuous checking from {self._format_date(self.start_date)} to {self._format_date(self.end_date)}"
-        )
+        for watch in self.watches:
+            logger.info(
+                f"Starting continuous checking for {watch.name} from {self._format_date(watch.start_date)} to {self._format_date(watch.end_date)}"
+            )
         logger.info(f"Checking every {self.check_interval} seconds")
-
-        # Track consecutive errors to avoid spam notifications
-        consecutive_errors = 0
-        max_consecutive_errors = 3  # Send notification after this many errors in a row
-        error_notification_sent = False
+        if self.scheduler.proximity:
+            logger.info(
+                "Proximity polling: near-term windows are checked more often "
+                "than distant ones"
+            )
+        if self.concurrency > 1:
+            logger.info(
+                f"Fetching up to {self.concurrency} windows concurrently, "
+                f"{self.request_spacing}s apart"
+            )
 
         try:
+            self.scheduler.update_windows(self._window_requests())
             while True:
-                # Check each date in our range in 30-day chunks
-                # The API returns ~40 days worth of data in one response
-                current_date = self.start_date
-                any_available = False
-                cycle_has_error = False
-
-                while current_date <= self.end_date:
-                    response = self.check_availability(current_date)
-
-                    if response.get("success", False):
-                        # Reset error counter on success
-                        consecutive_errors = 0
-                        error_notification_sent = False
-
-                        available_dates = self.parse_available_dates(response)
-
-                        # Find dates we haven't seen before
-                        new_available_dates = [
-                            date
-                            for date in available_dates
-                            if date not in self.available_dates
-                        ]
-
-                        if new_available_dates:
-                            any_available = True
-                            self.notify_available_dates(new_available_dates)
-                            # Add to our set of known available dates
-                            self.available_dates.update(new_available_dates)
-                    else:
-                        # Track errors
-                        cycle_has_error = True
-                        consecutive_errors += 1
-
-                        # Only notify on first occurrence or after threshold
-                        if (
-                            consecutive_errors >= max_consecutive_errors
-                            and not error_notification_sent
-                        ):
-                            if self.notification_manager:
-                                error_title = "Phantom Ranch Checker - Multiple Errors"
-                                error_message = (
-                                    f"The script has encountered {consecutive_errors} consecutive errors. "
-                                    f"Last error: {response.get('error', 'Unknown error')}. "
-                                    f"Please check the logs and verify your authentication."
-                                )
-                                sms_message = f"Phantom Ranch Checker Error: Multiple failures. Please check script."
-                                self.notification_manager.notify_all(
-                                    error_title, error_message, sms_message
-                                )
-                                error_notification_sent = True
-
-                    # Move forward by 30 days to reduce API calls
-                    current_date += timedelta(days=30)
-
-                    # Small delay between requests to be respectful
-                    time.sleep(2)
-
-                if not any_available and not cycle_has_error:
-                    logger.info("No availability found in this check cycle")
+                if self.config_reloader and self.config_reloader.pending():
+                    self.config_reloader.reload(self)
+
+                # Checks requested over the control API run even while paused
+                requested = self._take_check_requests()
+                if self.paused:
+                    due = requested
+                else:
+                    if requested:
+                        self.scheduler.poll_now(requested)
+                    due = self.scheduler.due()
+                if due:
+                    self.run_cycle(due)
+                else:
+                    self.flush_alerts()
+
+                # Re-plan after every pass; windows that appear because the
+                # response span shrank are polled straight away to close gaps
+                self.scheduler.update_windows(
+                    self._window_requests(), self._shrunk_groups()
+                )
+                if self.publish_status:
+                    self.refresh_status()
 
                 # Send a heartbeat notification every 24 hours if enabled
                 # Uncomment this if you want regular confirmation the script is still running
@@ -576,16 +3851,302 @@ class PhantomRanchChecker:
                 #         )
                 #     last_heartbeat_time = current_time
 
-                logger.info(
-                    f"Completed check. Next check in {self.check_interval} seconds"
+                # Windows skipped while backing off are still due; while
+                # paused, wait until resumed or a check is requested
+                wait = max(
+                    (
+                        self.check_interval
+                        if self.paused
+                        else self.scheduler.seconds_until_next()
+                    ),
+                    self.breaker.seconds_until_allowed(),
                 )
-                time.sleep(self.check_interval)
+                # Wake up in time to send a debounced alert
+                wait = min(wait, self.alerts.seconds_until_due())
+                if due:
+                    logger.info(
+                        f"Completed check. Next check in {wait:.0f} seconds",
+                        extra=CHATTY,
+                    )
+                if self.config_reloader:
+                    # Returns early when a reload is due or on wake()
+                    self.config_reloader.wait(wait)
+                else:
+                    self._wake.wait(wait)
+                    self._wake.clear()
 
         except KeyboardInterrupt:
             logger.info("Stopping checker - interrupted by user")
         except Exception as e:
             logger.error(f"Error in continuous checking: {e}")
             raise
+        finally:
+            self.flush_alerts(force=True)
+            self.close()
+
+
+def shard_watches(watches: List[Watch], index: int, count: int) -> List[Watch]:
+    """
+    Return one shard of the watches, splitting each date range into slices.
+
+    Args:
+        watches: Watches to split
+        index: Shard number, from 0
+        count: Number of shards
+
+    Returns:
+        This shard's slice of each watch (ranges shorter than count may
+        leave some shards without a slice)
+    """
+    sharded = []
+    for watch in watches:
+        days = (watch.end_date - watch.start_date).days + 1
+        first = days * index // count
+        last = days * (index + 1) // count - 1
+        if last < first:
+            continue
+        sharded.append(
+            Watch(
+                watch.start_date + timedelta(days=first),
+                watch.start_date + timedelta(days=last),
+                watch.nights,
+                watch.people_per_room,
+                f"{watch.name} [shard {index + 1}/{count}]",
+            )
+        )
+    return sharded
+
+
+def run_shard(index: int, count: int, config: Dict) -> None:
+    """
+    Poll one shard of the watches in a worker process.
+
+    Discoveries and runs of errors are written to the shared state store
+    and notified by the ShardLeader, so the worker sends no notifications
+    itself.
+
+    Args:
+        index: Shard number, from 0
+        count: Number of shards
+        config: Checker settings; see ShardLeader.start_workers()
+    """
+    # Spawned workers start from a fresh interpreter without main()'s setup.
+    # Each logs to its own file, so no two processes rotate the same one
+    log_root, log_ext = os.path.splitext(LOG_FILES[config["log_format"]])
+    setup_logging(
+        f"{log_root}.shard{index + 1}{log_ext}",
+        config["log_format"],
+        config["log_sample"],
+    )
+    # The leader stops workers with SIGTERM; flush state and logs on the way out
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    watches = shard_watches(config["watches"], index, count)
+    if not watches:
+        logger.warning(f"Shard {index + 1}/{count} has no dates to check")
+        return
+
+    checker = PhantomRanchChecker(
+        start_date=min(watch.start_date for watch in watches),
+        end_date=max(watch.end_date for watch in watches),
+        check_interval=config["check_interval"],
+        cookies=config["cookies"][index % len(config["cookies"])],
+        base_url=config["base_url"],
+        pool_size=config["pool_size"],
+        concurrency=config["concurrency"],
+        request_spacing=config["request_spacing"],
+        watches=watches,
+        state_store=AvailabilityStore(config["state_db"]),
+        proximity_polling=config["proximity_polling"],
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=config["failure_threshold"],
+            max_delay=config["max_backoff"],
+        ),
+        derive_nights=config["derive_nights"],
+        send_alerts=False,
+        cookie_refresh_interval=config["cookie_refresh_interval"],
+    )
+    checker.run_continuously()
+
+
+class ShardLeader:
+    """Alert once for each date found by shard worker processes."""
+
+    # Don't restart a crashing worker more often than this, in seconds
+    RESTART_DELAY = 60
+    # Seconds signalled workers get to exit before being signalled again
+    EXIT_GRACE = 5
+
+    def __init__(
+        self,
+        checker: PhantomRanchChecker,
+        state_store: AvailabilityStore,
+        poll_interval: float = 2.0,
+    ):
+        """
+        Initialize the leader.
+
+        Args:
+            checker: Checker whose alerting (coalescing, event log and
+                notifications) is used; it does no polling of its own
+            state_store: Store the workers write their discoveries to
+            poll_interval: Seconds between reads of the store
+        """
+        self.checker = checker
+        self.state_store = state_store
+        self.poll_interval = poll_interval
+
+        # Transitions up to the cursor had their alerts handed off before the
+        # leader stopped; later ones (perhaps held for the debounce when it
+        # died) are read again so their dates are alerted
+        alerted_id = state_store.get_cursor("leader")
+        if alerted_id is None:
+            # First start on this database
+            alerted_id = state_store.last_transition_id()
+            state_store.set_cursor("leader", alerted_id)
+        self.checker.available_dates = state_store.load_available(as_of=alerted_id)
+        self._last_id = self._alerted_id = alerted_id
+        # Transitions read before the restart are already in the event log
+        self._logged_id = state_store.last_transition_id()
+        self._last_error_id = state_store.last_error_id()
+
+        import multiprocessing
+
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[Optional["multiprocessing.Process"]] = []
+        self._started_at: List[float] = []
+        self._count = 0
+        self._config: Dict = {}
+
+    def _start_worker(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_shard,
+            args=(index, self._count, self._config),
+            name=f"shard-{index + 1}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Started shard {index + 1}/{self._count} (pid {process.pid})")
+
+    def start_workers(self, count: int, config: Dict) -> None:
+        """
+        Start one worker process per shard.
+
+        Args:
+            count: Number of shards
+            config: Checker settings for the workers: watches, cookies (a list,
+                used round-robin), base_url, state_db, check_interval, pool_size,
+                concurrency, request_spacing, proximity_polling,
+                failure_threshold, max_backoff, derive_nights, log_format,
+                log_sample and cookie_refresh_interval
+        """
+        self._count = count
+        self._config = config
+        self._workers = [None] * count
+        self._started_at = [0.0] * count
+        for index in range(count):
+            self._start_worker(index)
+
+    def _check_workers(self) -> None:
+        """Restart workers that have crashed."""
+        for index, process in enumerate(self._workers):
+            if process is None or process.is_alive() or process.exitcode == 0:
+                continue
+            if time.monotonic() - self._started_at[index] < self.RESTART_DELAY:
+                continue
+            logger.error(
+                f"Shard {index + 1}/{self._count} exited with code "
+                f"{process.exitcode}; restarting"
+            )
+            self._start_worker(index)
+
+    def poll(self) -> int:
+        """
+        Queue alerts for dates the workers found since the last poll, and
+        send the error notifications they wrote.
+
+        Returns:
+            Number of transitions read
+        """
+        rows = self.state_store.transitions_since(self._last_id)
+        discoveries: Dict[Tuple[int, int], List[str]] = {}
+        for transition_id, stay_date, nights, people, available, at in rows:
+            self._last_id = transition_id
+            known_dates = self.checker.available_dates.setdefault(
+                (nights, people), set()
+            )
+            if self.checker.event_log and transition_id > self._logged_id:
+                # When the worker saw it, not when the leader got round to it
+                self.checker.event_log.record(
+                    stay_date, nights, people, available, at=at
+                )
+            if not available:
+                # Forget it so a reopening is alerted again
+                known_dates.discard(stay_date)
+            elif stay_date not in known_dates:
+                known_dates.add(stay_date)
+                discoveries.setdefault((nights, people), []).append(stay_date)
+        if self.checker.event_log:
+            self.checker.event_log.flush()
+
+        for (nights, people), dates in discoveries.items():
+            # Skip dates that closed again later in the batch
+            still_open = self.checker.available_dates[(nights, people)]
+            self.checker.alerts.add(
+                sorted(date for date in dates if date in still_open), nights, people
+            )
+
+        # Workers have no notifier of their own; send their error alerts
+        for error_id, source, consecutive, error in self.state_store.errors_since(
+            self._last_error_id
+        ):
+            self._last_error_id = error_id
+            self.checker.notify_errors(consecutive, error, source)
+        return len(rows)
+
+    def save_progress(self) -> None:
+        """Save how far alerts have been handed off, once none are held back."""
+        if self.checker.alerts.empty() and self._last_id != self._alerted_id:
+            self.state_store.set_cursor("leader", self._last_id)
+            self._alerted_id = self._last_id
+
+    def stop_workers(self, timeout: float = 10) -> None:
+        """Stop the worker processes."""
+        workers = [process for process in self._workers if process is not None]
+        if _sigterm_received:
+            # The SIGTERM most likely went to the workers too (systemd signals
+            # the whole control group); let those already exiting finish
+            deadline = time.monotonic() + self.EXIT_GRACE
+            for process in workers:
+                process.join(max(0.0, deadline - time.monotonic()))
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+        for process in workers:
+            process.join(timeout)
+
+    def run(self) -> None:
+        """Read worker discoveries and send alerts until interrupted."""
+        logger.info(f"Leading {self._count} shard workers")
+        try:
+            while True:
+                self.poll()
+                self.checker.flush_alerts()
+                self.save_progress()
+                self._check_workers()
+                time.sleep(
+                    min(self.poll_interval, self.checker.alerts.seconds_until_due())
+                )
+        except KeyboardInterrupt:
+            logger.info("Stopping shard workers - interrupted by user")
+        finally:
+            self.poll()
+            self.checker.flush_alerts(force=True)
+            self.save_progress()
+            self.stop_workers()
+            self.state_store.close()
+            self.checker.close()
 
 
 def parse_date(date_str: str) -> datetime:
@@ -596,6 +4157,196 @@ def parse_date(date_str: str) -> datetime:
         raise ValueError(f"Invalid date format: {date_str}. Use MM/DD/YYYY format.")
 
 
+def parse_result_date(date_str: str) -> Optional[date]:
+    """Parse a date key from the API `results` map, or None if unrecognized."""
+    for date_format in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(date_str, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            # "-0000" dates parse as naive; HTTP dates are always GMT
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def load_watches(
+    config_file: str,
+    default_start: datetime,
+    default_end: datetime,
+    default_nights: int = 2,
+    default_people: int = 4,
+) -> List[Watch]:
+    """
+    Load watches from a JSON config file.
+
+    The file holds a list of watches (or an object with a "watches" list),
+    each with optional "name", "nights", "people", "start_date" and
+    "end_date" (MM/DD/YYYY) keys. Missing keys fall back to the defaults.
+    """
+    with open(config_file, "r") as f:
+        config = json.load(f)
+
+    entries = config.get("watches", []) if isinstance(config, dict) else config
+    if not entries:
+        raise ValueError(f"No watches defined in {config_file}")
+
+    watches = []
+    for entry in entries:
+        start_date = (
+            parse_date(entry["start_date"]) if "start_date" in entry else default_start
+        )
+        end_date = parse_date(entry["end_date"]) if "end_date" in entry else default_end
+        if start_date > end_date:
+            raise ValueError(
+                f"Start date must be before end date in watch {entry.get('name', entry)}"
+            )
+        watches.append(
+            Watch(
+                start_date=start_date,
+                end_date=end_date,
+                nights=int(entry.get("nights", default_nights)),
+                people_per_room=int(entry.get("people", default_people)),
+                name=entry.get("name"),
+            )
+        )
+    return watches
+
+
+def load_settings(config_file: str) -> Dict:
+    """
+    Load the optional settings that sit beside "watches" in a config file.
+
+    Recognized keys are "interval" (seconds), "email_to", "phone_number" and
+    "carrier". Only keys present in the file are returned.
+    """
+    with open(config_file, "r") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        return {}
+
+    settings = {
+        key: config[key]
+        for key in ("interval", "email_to", "phone_number", "carrier")
+        if key in config
+    }
+    if "interval" in settings:
+        settings["interval"] = int(settings["interval"])
+    if "carrier" in settings and settings["carrier"] not in CARRIER_GATEWAYS:
+        raise ValueError(f"Unknown carrier in {config_file}: {settings['carrier']}")
+    return settings
+
+
+class ConfigReloader:
+    """Reload the watch config file on SIGHUP or when it changes on disk."""
+
+    def __init__(
+        self,
+        config_file: str,
+        default_start: datetime,
+        default_end: datetime,
+        default_nights: int = 2,
+        default_people: int = 4,
+        poll_interval: float = 5.0,
+    ):
+        """
+        Initialize the reloader.
+
+        Args:
+            config_file: Watch config file (see load_watches and load_settings)
+            default_start: Start date for watches that don't set one
+            default_end: End date for watches that don't set one
+            default_nights: Nights for watches that don't set them
+            default_people: People for watches that don't set them
+            poll_interval: Seconds between checks of the file's modification time
+        """
+        self.config_file = config_file
+        self.defaults = (default_start, default_end, default_nights, default_people)
+        self.poll_interval = poll_interval
+        self._mtime = self._stat()
+        self._requested = threading.Event()
+        # Ends wait() early, for a reload request or an interrupt()
+        self._wakeup = threading.Event()
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def install_signal_handler(self) -> None:
+        """Reload on SIGHUP (where the platform has it)."""
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_sighup)
+
+    def _on_sighup(self, signum, frame) -> None:
+        self._requested.set()
+        self._wakeup.set()
+
+    def pending(self) -> bool:
+        """Whether a reload was requested or the file has changed."""
+        return self._requested.is_set() or self._stat() != self._mtime
+
+    def interrupt(self) -> None:
+        """End the current wait() early without requesting a reload."""
+        self._wakeup.set()
+
+    def wait(self, seconds: float) -> None:
+        """Sleep for up to `seconds`, returning early if a reload is pending."""
+        deadline = time.monotonic() + seconds
+        while not self.pending():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self._wakeup.wait(min(remaining, self.poll_interval)):
+                break
+        self._wakeup.clear()
+
+    def reload(self, checker: "PhantomRanchChecker") -> bool:
+        """
+        Apply the config file to a running checker.
+
+        An unreadable or invalid file is logged and the current
+        configuration is kept.
+
+        Returns:
+            Whether the new configuration was applied
+        """
+        self._requested.clear()
+        self._mtime = self._stat()
+        logger.info(f"Reloading configuration from {self.config_file}")
+        try:
+            watches = load_watches(self.config_file, *self.defaults)
+            settings = load_settings(self.config_file)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"Keeping the current configuration; reload failed: {e}")
+            return False
+
+        checker.apply_config(watches, settings.get("interval"))
+        if checker.notification_manager:
+            checker.notification_manager.update_targets(
+                settings.get("email_to"),
+                settings.get("phone_number"),
+                settings.get("carrier"),
+            )
+        return True
+
+
 def extract_cookies_from_curl(curl_command: str) -> Optional[str]:
     """Extract cookie string from a curl command."""
     if not curl_command or "-b" not in curl_command:
@@ -628,6 +4379,38 @@ def extract_cookies_from_curl(curl_command: str) -> Optional[str]:
         return None
 
 
+def load_cookie_dir(directory: str) -> List[Tuple[str, str]]:
+    """
+    Load one cookie set from each file in a directory.
+
+    A file may hold a cookie string or a saved curl command.
+
+    Args:
+        directory: Directory to read
+
+    Returns:
+        (file name, cookie string) pairs, in file name order
+    """
+    cookie_sets = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        with open(path, "r") as f:
+            content = f.read().strip()
+        cookies = (
+            extract_cookies_from_curl(content)
+            if content.startswith("curl")
+            else content
+        )
+        if cookies:
+            cookie_sets.append((name, cookies))
+        else:
+            logger.warning(f"No cookies found in {path}")
+    logger.info(f"Loaded {len(cookie_sets)} cookie sets from {directory}")
+    return cookie_sets
+
+
 def save_cookies_to_file(
     cookies: str, filename: str = "phantom_ranch_cookies.txt"
 ) -> None:
@@ -640,8 +4423,29 @@ def save_cookies_to_file(
         print(f"Error saving cookies: {e}")
 
 
+# Set once SIGTERM has started a shutdown
+_sigterm_received = False
+
+
+def _handle_sigterm(signum, frame) -> None:
+    """Turn the first SIGTERM into SystemExit so finally blocks and atexit hooks run."""
+    global _sigterm_received
+    # Under systemd the whole control group is signalled and the shard leader
+    # then signals its workers again; a second SystemExit would cut the
+    # store, event log and log flushes short
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _sigterm_received = True
+    logger.info("Received SIGTERM; shutting down")
+    raise SystemExit(0)
+
+
 def main():
     """Main entry point for the script."""
+    from dotenv import load_dotenv
+
+    # Before the parser is built: argument defaults read the environment
+    load_dotenv("phantom-ranch.env")
+
     parser = argparse.ArgumentParser(description="Check Phantom Ranch availability.")
     parser.add_argument(
         "--start-date", help="Start date to check (MM/DD/YYYY). Default: today"
@@ -661,6 +4465,142 @@ def main():
         default=3600,
         help="Check interval in seconds (default: 3600 = 1 hour)",
     )
+    parser.add_argument(
+        "--proximity-polling",
+        action="store_true",
+        help="Check near-term dates more often and distant dates less often, "
+        "at the same overall request rate",
+    )
+    parser.add_argument(
+        "--failure-threshold",
+        type=int,
+        default=5,
+        help="Consecutive request failures before pausing requests (default: 5)",
+    )
+    parser.add_argument(
+        "--max-backoff",
+        type=float,
+        default=1800,
+        help="Longest pause between requests while failing, in seconds (default: 1800)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--control-port",
+        type=int,
+        help="Serve a JSON control API on http://127.0.0.1:PORT/ to query "
+        "availability, window and session state, trigger checks and "
+        "pause/resume polling",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=("text", "json"),
+        default="text",
+        help="text: plain lines written as they are logged (default). json: "
+        "JSON lines written by a background thread to "
+        "phantom_ranch_checker.jsonl, with rotated files gzip-compressed",
+    )
+    parser.add_argument(
+        "--log-sample",
+        type=float,
+        default=1.0,
+        metavar="RATE",
+        help="Share of routine per-window and per-cycle log lines to keep, "
+        "from 0 to 1; warnings, errors and discoveries are always kept "
+        "(default: 1, keep all)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        help="Record per-cycle detection-to-alert timings to this JSON-lines file",
+    )
+    parser.add_argument(
+        "--trace-summary",
+        type=str,
+        metavar="TRACE_FILE",
+        help="Print latency percentiles for each stage of a trace file and exit",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="RECORDING_FILE",
+        help="Append every request and full response to this JSONL file "
+        "(gzip-compressed if it ends in .gz)",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="RECORDING_FILE",
+        help="Replay a recording through the parse/diff/notify path at full "
+        "speed instead of polling the site, then exit",
+    )
+    parser.add_argument(
+        "--base-url",
+        type=str,
+        help="Availability endpoint to poll instead of the live site "
+        "(e.g. a local stub_server.py)",
+    )
+    parser.add_argument(
+        "--derive-nights",
+        action="store_true",
+        help="Poll each party size once as 1-night stays and work out longer "
+        "stays locally from consecutive available nights",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the date range across this many worker processes; this "
+        "process then only sends the alerts (default: 1 = no workers)",
+    )
+    parser.add_argument(
+        "--worker-cookies",
+        action="append",
+        default=[],
+        metavar="COOKIES_FILE",
+        help="Cookie file for a worker; repeat to give workers their own "
+        "sessions, used in turn (default: the main cookies for every worker)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=4,
+        help="Maximum keep-alive connections in the HTTP pool (default: 4)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum window requests in flight at once (default: 1 = sequential)",
+    )
+    parser.add_argument(
+        "--request-spacing",
+        type=float,
+        default=2.0,
+        help="Minimum seconds between window requests (default: 2)",
+    )
+    parser.add_argument(
+        "--watch-config",
+        type=str,
+        help="JSON file listing several nights/people/date-range watches to check",
+    )
+    parser.add_argument(
+        "--state-db",
+        type=str,
+        default="phantom_ranch_state.db",
+        help="SQLite file that keeps availability across restarts "
+        "(default: phantom_ranch_state.db)",
+    )
+    parser.add_argument(
+        "--event-log",
+        type=str,
+        default="phantom_ranch_events.jsonl",
+        help="Append-only JSON-lines log of every date opening and closing; "
+        "query it with query_events.py (default: phantom_ranch_events.jsonl)",
+    )
     parser.add_argument(
         "--cookies", type=str, help="Cookie string from browser session"
     )
@@ -675,6 +4615,24 @@ def main():
         type=str,
         help="File containing curl command to extract cookies from",
     )
+    parser.add_argument(
+        "--cookies-dir",
+        type=str,
+        help="Directory of cookie files or saved curl commands, one session "
+        "each; requests are spread across the healthy ones",
+    )
+    parser.add_argument(
+        "--refresh-cookies",
+        action="store_true",
+        help="Keep cookie sessions alive from inside the checker, refreshing "
+        "each one on an interval and straight away when it is challenged",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=int,
+        default=1800,
+        help="Seconds between routine cookie refreshes (default: 1800)",
+    )
     parser.add_argument(
         "--save-cookies",
         action="store_true",
@@ -707,7 +4665,15 @@ def main():
         help="SMTP port for email notifications (default: 587)",
     )
     parser.add_argument(
-        "--email-user", type=str, help="SMTP username for email notifications"
+        "--email-no-tls",
+        action="store_true",
+        help="Don't use STARTTLS (only for local SMTP test servers)",
+    )
+    parser.add_argument(
+        "--email-user",
+        type=str,
+        help="SMTP username for email notifications (omit for a server without "
+        "AUTH, such as a local test server)",
     )
     parser.add_argument(
         "--email-password",
@@ -728,9 +4694,21 @@ def main():
     parser.add_argument(
         "--carrier",
         type=str,
-        choices=["verizon", "att", "tmobile", "sprint", "cricket"],
+        choices=list(CARRIER_GATEWAYS),
         help="Cell carrier for SMS gateway (verizon, att, tmobile, sprint, cricket)",
     )
+    parser.add_argument(
+        "--alert-debounce",
+        type=float,
+        default=0,
+        help="Seconds to collect new dates into one alert (default: 0 = one alert per check cycle)",
+    )
+    parser.add_argument(
+        "--notify-timeout",
+        type=float,
+        default=60,
+        help="Seconds to wait for each notification attempt (default: 60)",
+    )
     parser.add_argument(
         "--error-notify",
         action="store_true",
@@ -744,6 +4722,16 @@ def main():
     )
 
     args = parser.parse_args()
+    if not 0.0 <= args.log_sample <= 1.0:
+        parser.error("--log-sample must be between 0 and 1")
+    setup_logging(LOG_FILES[args.log_format], args.log_format, args.log_sample)
+    # systemd stops the service with SIGTERM; unwind through the same
+    # shutdown path as Ctrl+C so pending alerts and state are flushed
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    if args.trace_summary:
+        print(summarize_trace(args.trace_summary))
+        return
 
     try:
         # Default to checking from today to 1 year from now
@@ -761,6 +4749,29 @@ def main():
         if start_date > end_date:
             raise ValueError("Start date must be before end date")
 
+        config_reloader = None
+        if args.watch_config:
+            watches = load_watches(
+                args.watch_config, start_date, end_date, args.nights, args.people
+            )
+            # Settings in the config file win over the command line, so a
+            # reload and a restart end up with the same configuration
+            settings = load_settings(args.watch_config)
+            args.interval = settings.get("interval", args.interval)
+            args.email_to = settings.get("email_to", args.email_to)
+            args.phone_number = settings.get("phone_number", args.phone_number)
+            args.carrier = settings.get("carrier", args.carrier)
+            config_reloader = ConfigReloader(
+                args.watch_config, start_date, end_date, args.nights, args.people
+            )
+            config_reloader.install_signal_handler()
+        else:
+            watches = [Watch(start_date, end_date, args.nights, args.people)]
+        watch_summary = "; ".join(
+            f"{watch.name} between {watch.start_date.strftime('%m/%d/%Y')} and {watch.end_date.strftime('%m/%d/%Y')}"
+            for watch in watches
+        )
+
         # Get cookies either from argument, file, or curl command
         cookies = None
         if args.cookies:
@@ -796,6 +4807,12 @@ def main():
         if args.save_cookies and cookies:
             save_cookies_to_file(cookies)
 
+        cookie_sets = [("default", cookies)] if cookies else []
+        if args.cookies_dir:
+            cookie_sets.extend(load_cookie_dir(args.cookies_dir))
+            if not cookies and cookie_sets:
+                cookies = cookie_sets[0][1]
+
         if not cookies:
             print("WARNING: No cookies provided. Authentication may fail.")
             print(
@@ -806,8 +4823,26 @@ def main():
             print("  2. --cookies-file path/to/cookies.txt")
             print("  3. --curl-command 'curl command...'")
             print("  4. --curl-file path/to/curl.txt")
+            print("  5. --cookies-dir path/to/cookie/files")
             print()
 
+        if args.replay:
+            # Notifications and the state DB are left out so a replay can't
+            # send real alerts or overwrite the live state
+            checker = PhantomRanchChecker(
+                start_date=start_date,
+                end_date=end_date,
+                nights=args.nights,
+                people_per_room=args.people,
+                cookies=cookies,
+                watches=watches,
+                tracer=Tracer(args.trace_file) if args.trace_file else None,
+                derive_nights=args.derive_nights,
+            )
+            replayed = checker.replay(args.replay)
+            print(f"Replayed {replayed} recorded responses from {args.replay}")
+            return
+
         # Set up notification manager if any notifications are enabled
         notification_manager = None
         if (
@@ -822,12 +4857,14 @@ def main():
                 if (
                     not args.email_from
                     or (not args.email_to and not args.sms_notify)
-                    or not args.email_user
-                    or not args.email_password
+                    # Without --email-user the server is used without AUTH
+                    or (args.email_user and not args.email_password)
                 ):
+                    if args.email_user and not args.email_password:
+                        print("WARNING: --email-user requires --email-password")
                     if args.error_notify and not args.desktop_notify:
                         print(
-                            "WARNING: Error notifications via email/SMS require --email-from, --email-user, and --email-password"
+                            "WARNING: Error notifications via email/SMS require --email-from"
                         )
                         if not args.sms_notify and not args.email_to:
                             print(
@@ -845,6 +4882,7 @@ def main():
                         "smtp_port": args.email_port,
                         "username": args.email_user,
                         "password": args.email_password,
+                        "use_tls": not args.email_no_tls,
                     }
 
             # Set up SMS configuration if needed
@@ -866,19 +4904,10 @@ def main():
                         )
                         args.error_notify = False
                 else:
-                    # Map carrier choices to gateway domains
-                    carrier_map = {
-                        "verizon": "vtext.com",
-                        "att": "txt.att.net",
-                        "tmobile": "tmomail.net",
-                        "sprint": "messaging.sprintpcs.com",
-                        "cricket": "sms.cricketwireless.net",
-                    }
-
                     sms_config = {
                         "method": "email_to_sms",
                         "phone_number": args.phone_number,
-                        "carrier_gateway": carrier_map.get(args.carrier),
+                        "carrier_gateway": CARRIER_GATEWAYS.get(args.carrier),
                     }
 
             # Only create notification manager if at least one notification type is enabled
@@ -894,13 +4923,22 @@ def main():
                     enable_desktop=args.desktop_notify,
                 )
 
+                # Deliver in the background so polling never waits on a send
+                notification_manager.start_dispatcher(
+                    channel_timeout=args.notify_timeout
+                )
+
                 # Send a startup notification
-                notification_manager.notify_all(
+                notification_manager.submit(
                     "Phantom Ranch Checker Started",
-                    f"The Phantom Ranch availability checker has started. Checking for {args.nights}-night stays between {start_date.strftime('%m/%d/%Y')} and {end_date.strftime('%m/%d/%Y')}. Will check every {args.interval} seconds.",
-                    f"Phantom Ranch Checker started. Checking for {args.nights}-night stays. Will notify if spots available.",
+                    f"The Phantom Ranch availability checker has started. Checking {watch_summary}. Will check every {args.interval} seconds.",
+                    f"Phantom Ranch Checker started. Checking {len(watches)} watch(es). Will notify if spots available.",
                 )
 
+        tracer = Tracer(args.trace_file) if args.trace_file else None
+        if notification_manager:
+            notification_manager.tracer = tracer
+
         checker = PhantomRanchChecker(
             start_date=start_date,
             end_date=end_date,
@@ -909,17 +4947,93 @@ def main():
             people_per_room=args.people,
             cookies=cookies,
             notification_manager=notification_manager,
+            pool_size=args.pool_size,
+            concurrency=args.concurrency,
+            request_spacing=args.request_spacing,
+            watches=watches,
+            # With workers, they write the state and the leader only reads it
+            state_store=AvailabilityStore(args.state_db) if args.workers <= 1 else None,
+            event_log=EventLog(args.event_log),
+            proximity_polling=args.proximity_polling,
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=args.failure_threshold, max_delay=args.max_backoff
+            ),
+            alert_debounce=args.alert_debounce,
+            tracer=tracer,
+            derive_nights=args.derive_nights,
+            cookie_sets=cookie_sets or None,
+            config_reloader=config_reloader,
+            # Workers refresh their own sessions; the leader makes no requests
+            cookie_refresh_interval=(
+                args.refresh_interval
+                if args.refresh_cookies and args.workers <= 1
+                else None
+            ),
+            recorder=ResponseRecorder(args.record) if args.record else None,
+            base_url=args.base_url,
         )
 
+        leader = None
+        if args.workers > 1:
+            worker_cookies = []
+            for cookies_file in args.worker_cookies:
+                with open(cookies_file, "r") as f:
+                    worker_cookies.append(f.read().strip())
+            leader = ShardLeader(checker, AvailabilityStore(args.state_db))
+            leader.start_workers(
+                args.workers,
+                {
+                    "watches": watches,
+                    "cookies": worker_cookies
+                    or [cookie_string for _, cookie_string in cookie_sets]
+                    or [cookies],
+                    "base_url": checker.base_url,
+                    "state_db": args.state_db,
+                    "check_interval": args.interval,
+                    "pool_size": args.pool_size,
+                    "concurrency": args.concurrency,
+                    "request_spacing": args.request_spacing,
+                    "proximity_polling": args.proximity_polling,
+                    "failure_threshold": args.failure_threshold,
+                    "max_backoff": args.max_backoff,
+                    "derive_nights": args.derive_nights,
+                    "log_format": args.log_format,
+                    "log_sample": args.log_sample,
+                    "cookie_refresh_interval": (
+                        args.refresh_interval if args.refresh_cookies else None
+                    ),
+                },
+            )
+
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port)
+        if args.control_port:
+            if leader:
+                logger.warning("The control API is not available with --workers")
+            else:
+                start_control_server(checker, args.control_port)
+
         print(f"Phantom Ranch Availability Checker")
-        print(
-            f"Checking for {args.nights} night stays between {start_date.strftime('%m/%d/%Y')} and {end_date.strftime('%m/%d/%Y')}"
-        )
+        for watch in watches:
+            print(
+                f"Checking {watch.name} between {watch.start_date.strftime('%m/%d/%Y')} and {watch.end_date.strftime('%m/%d/%Y')}"
+            )
         print(f"Checking every {args.interval} seconds")
+        if leader:
+            print(f"Split across {args.workers} worker processes")
         print("Press Ctrl+C to stop")
         print("-" * 50)
 
-        checker.run_continuously()
+        try:
+            if leader:
+                leader.run()
+            else:
+                checker.run_continuously()
+        finally:
+            if notification_manager:
+                notification_manager.close()
+            if tracer:
+                tracer.close()
 
     except ValueError as e:
         logger.error(str(e))
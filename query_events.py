@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Query the availability event log written by the checker.
+
+Prints every opening and closing that matches the filters, oldest first, or
+with --summary, how often each stay date opened and for how long in total.
+Only the part of the log inside --since/--until is read.
+
+    python query_events.py --from 2026-05-01 --to 2026-05-31 --nights 2
+    python query_events.py --since 2026-01-01 --summary
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from main import parse_result_date, read_events
+
+
+def parse_stay_date(value):
+    """argparse type for a stay date (YYYY-MM-DD or MM/DD/YYYY)."""
+    parsed = parse_result_date(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(
+            f"Invalid date: {value}. Use YYYY-MM-DD or MM/DD/YYYY."
+        )
+    return parsed
+
+
+def parse_time(value):
+    """argparse type for an event time (YYYY-MM-DD or YYYY-MM-DDTHH:MM), as unix seconds."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid time: {value}. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM."
+        )
+
+
+def summarize(events):
+    """
+    Count openings and total open time per (stay date, nights, people).
+
+    Returns:
+        Report lines
+    """
+    stays = {}
+    last_seen = None
+    for event in events:
+        key = (event["d"], event["n"], event["p"])
+        stay = stays.setdefault(key, {"opened": 0, "open_seconds": 0.0, "since": None})
+        if event["a"]:
+            stay["opened"] += 1
+            stay["since"] = event["t"]
+        elif stay["since"] is not None:
+            stay["open_seconds"] += event["t"] - stay["since"]
+            stay["since"] = None
+        last_seen = event["t"]
+
+    lines = [f"{'stay date':<10}  nights  people  opened  open for"]
+    for (stay_date, nights, people), stay in sorted(stays.items()):
+        open_seconds = stay["open_seconds"]
+        still_open = stay["since"] is not None
+        if still_open:
+            open_seconds += last_seen - stay["since"]
+        lines.append(
+            f"{stay_date:<10}  {nights:>6}  {people:>6}  {stay['opened']:>6}  "
+            f"{open_seconds / 3600:7.1f} h{' (open)' if still_open else ''}"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query the Phantom Ranch availability event log."
+    )
+    parser.add_argument(
+        "--file",
+        default="phantom_ranch_events.jsonl",
+        help="Event log to read (default: phantom_ranch_events.jsonl)",
+    )
+    parser.add_argument(
+        "--from", dest="start", type=parse_stay_date, help="Earliest stay date"
+    )
+    parser.add_argument("--to", dest="end", type=parse_stay_date, help="Latest stay date")
+    parser.add_argument("--nights", type=int, help="Only stays of this many nights")
+    parser.add_argument("--people", type=int, help="Only this many people per room")
+    parser.add_argument(
+        "--since", type=parse_time, help="Only events at or after this time"
+    )
+    parser.add_argument("--until", type=parse_time, help="Only events up to this time")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Per stay date, count openings and total time open instead of "
+        "listing events",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print matching events as JSON lines"
+    )
+    args = parser.parse_args()
+
+    try:
+        events = read_events(
+            args.file,
+            start=args.start,
+            end=args.end,
+            nights=args.nights,
+            people=args.people,
+            since=args.since,
+            until=args.until,
+        )
+        if args.summary:
+            for line in summarize(events):
+                print(line)
+            return
+        for event in events:
+            if args.json:
+                print(json.dumps(event, separators=(",", ":")))
+                continue
+            at = datetime.fromtimestamp(event["t"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(
+                f"{at}  {'opened' if event['a'] else 'closed'}  {event['d']}  "
+                f"{event['n']} night(s), {event['p']} people"
+            )
+    except FileNotFoundError:
+        print(f"No event log at {args.file}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
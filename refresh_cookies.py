@@ -4,6 +4,9 @@ Phantom Ranch Session Refresher
 
 This script attempts to maintain an active session with Phantom Ranch
 by making periodic requests to keep cookies valid before they expire.
+
+The checker can also import SessionRefresher and refresh its own sessions
+in the background (see --refresh-cookies in main.py).
 """
 
 import argparse
@@ -15,15 +18,6 @@ from datetime import datetime
 
 import requests
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("phantom_ranch_session.log"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
 logger = logging.getLogger(__name__)
 
 
@@ -46,17 +40,29 @@ def parse_cookie_string(cookie_string):
 class SessionRefresher:
     """Class to refresh a Phantom Ranch website session."""
 
-    def __init__(self, cookies, refresh_interval=3600):
+    def __init__(
+        self,
+        cookies=None,
+        refresh_interval=3600,
+        session=None,
+        cookies_file="phantom_ranch_cookies.txt",
+    ):
         """
         Initialize the session refresher.
 
         Args:
             cookies: Cookie string from a successful browser session
             refresh_interval: How often to refresh in seconds (default: 1 hour)
+            session: Existing session to refresh instead of a new one; its
+                cookie jar is updated in place and its headers are left alone
+            cookies_file: Where to save refreshed cookies (None to skip saving)
         """
         self.cookies = cookies
         self.refresh_interval = refresh_interval
-        self.session = requests.Session()
+        self.cookies_file = cookies_file
+        # A borrowed session keeps its own headers; ours are sent per request
+        self._owns_session = session is None
+        self.session = session if session is not None else requests.Session()
 
         # Set up headers that mimic a real browser
         self.headers = {
@@ -79,7 +85,8 @@ class SessionRefresher:
         elif isinstance(cookies, dict):
             self.session.cookies.update(cookies)
 
-        self.session.headers.update(self.headers)
+        if self._owns_session:
+            self.session.headers.update(self.headers)
 
         # URLs to visit for session refreshing
         self.urls = [
@@ -94,7 +101,7 @@ class SessionRefresher:
         try:
             for url in self.urls:
                 logger.info(f"Visiting {url}")
-                response = self.session.get(url, timeout=30)
+                response = self.session.get(url, headers=self.headers, timeout=30)
 
                 if response.status_code == 200:
                     logger.info(
@@ -124,13 +131,14 @@ class SessionRefresher:
             logger.info(f"Updated cookies: {json.dumps(cookie_dict)}")
 
             # Save cookies to file
-            with open("phantom_ranch_cookies.txt", "w") as f:
-                cookie_string = "; ".join(
-                    [f"{name}={value}" for name, value in cookie_dict.items()]
-                )
-                f.write(cookie_string)
+            if self.cookies_file:
+                with open(self.cookies_file, "w") as f:
+                    cookie_string = "; ".join(
+                        [f"{name}={value}" for name, value in cookie_dict.items()]
+                    )
+                    f.write(cookie_string)
 
-            logger.info("Updated cookies saved to phantom_ranch_cookies.txt")
+                logger.info(f"Updated cookies saved to {self.cookies_file}")
             return True
 
         except Exception as e:
@@ -180,6 +188,16 @@ def main():
 
     args = parser.parse_args()
 
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler("phantom_ranch_session.log"),
+            logging.StreamHandler(sys.stdout),
+        ],
+    )
+
     try:
         # Read cookies from file
         with open(args.cookies_file, "r") as f:
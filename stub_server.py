@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Phantom Ranch Stub Server
+
+A local stand-in for the availability calendar endpoint, used for offline
+benchmarking of the checker without touching the live site. Responses can be
+delayed and made to fail, and availability can follow one of several
+patterns:
+
+    none    nothing is ever available
+    fixed   only the dates given to the server are available
+    sparse  a seeded random fraction of dates is available, stable over time
+    churn   like sparse, but each date flips on every request with the
+            given probability, so every poll sees changes
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Answer availability requests with a fixed-span calendar of results."""
+
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Keep the stub quiet; benchmarks print their own output."""
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        """Serve a stand-in for the site's HTML pages."""
+        data = b"<html><body>Phantom Ranch stub</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+
+        try:
+            start = datetime.strptime(form["date"][0], "%m/%d/%Y")
+        except (KeyError, ValueError):
+            self._send_json(400, {"success": False, "msg": "Invalid date"})
+            return
+
+        self.server.delay()
+        if self.server.should_fail():
+            self._send_json(500, {"success": False, "msg": "Stub error"})
+            return
+
+        dates = [
+            (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+            for offset in range(self.server.span_days)
+        ]
+        self._send_json(200, {"success": True, "results": self.server.results(dates)})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub of the availability endpoint."""
+
+    daemon_threads = True
+
+    PATTERNS = ("none", "fixed", "sparse", "churn")
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        span_days=40,
+        available_dates=(),
+        pattern="fixed",
+        available_fraction=0.05,
+        churn_rate=0.01,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        seed=0,
+    ):
+        """
+        Initialize the stub server.
+
+        Args:
+            host: Interface to bind to
+            port: Port to listen on (0 picks a free port)
+            span_days: Number of days returned in each response
+            available_dates: Dates (YYYY-MM-DD) to report as available
+            pattern: Availability pattern, one of PATTERNS
+            available_fraction: Share of dates available for sparse and churn
+            churn_rate: Chance each date flips per request for churn
+            latency: Base response delay in seconds
+            jitter: Extra random delay of up to this many seconds
+            error_rate: Share of requests answered with HTTP 500
+            seed: Random seed, so runs are repeatable
+        """
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"Unknown availability pattern: {pattern}")
+        super().__init__((host, port), StubRequestHandler)
+        self.span_days = span_days
+        self.available_dates = set(available_dates)
+        self.pattern = pattern
+        self.available_fraction = available_fraction
+        self.churn_rate = churn_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Current availability of each date seen so far (sparse and churn)
+        self._state = {}
+
+    def delay(self):
+        """Sleep for the configured latency plus jitter."""
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._random.uniform(0, self.jitter)
+            time.sleep(self.latency + extra)
+
+    def should_fail(self):
+        """Whether this request should get an error response."""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def results(self, dates):
+        """Availability of each date for one response, per the pattern."""
+        if self.pattern == "none":
+            return {d: False for d in dates}
+        if self.pattern == "fixed":
+            return {d: d in self.available_dates for d in dates}
+
+        with self._lock:
+            results = {}
+            for d in dates:
+                if d not in self._state:
+                    # Seed per date so sparse results don't depend on request order
+                    draw = random.Random(f"{self.seed}:{d}").random()
+                    self._state[d] = draw < self.available_fraction
+                elif self.pattern == "churn" and self._random.random() < self.churn_rate:
+                    self._state[d] = not self._state[d]
+                results[d] = self._state[d] or d in self.available_dates
+            return results
+
+    @property
+    def url(self):
+        """URL to pass to PhantomRanchChecker as base_url."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/phantom-ranch-lottery/availability/calendar"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a local stub of the Phantom Ranch availability endpoint."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind host")
+    parser.add_argument("--port", type=int, default=8080, help="Bind port")
+    parser.add_argument(
+        "--span-days",
+        type=int,
+        default=40,
+        help="Days of results per response (default: 40)",
+    )
+    parser.add_argument(
+        "--pattern",
+        choices=StubServer.PATTERNS,
+        default="fixed",
+        help="Availability pattern (default: fixed)",
+    )
+    parser.add_argument(
+        "--available-date",
+        action="append",
+        default=[],
+        help="Date (YYYY-MM-DD) to report as available; may be repeated",
+    )
+    parser.add_argument(
+        "--available-fraction",
+        type=float,
+        default=0.05,
+        help="Share of dates available for sparse/churn (default: 0.05)",
+    )
+    parser.add_argument(
+        "--churn-rate",
+        type=float,
+        default=0.01,
+        help="Chance each date flips per request for churn (default: 0.01)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Base response delay in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="Extra random delay of up to this many seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests answered with HTTP 500 (default: 0)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    server = StubServer(
+        args.host,
+        args.port,
+        span_days=args.span_days,
+        available_dates=args.available_date,
+        pattern=args.pattern,
+        available_fraction=args.available_fraction,
+        churn_rate=args.churn_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    # Flushed so a parent process can read the URL when the port was 0
+    print(f"Stub server listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()